@@ -0,0 +1,104 @@
+"""
+Drive XIVAPIClient against the local stub server at increasing concurrency and report throughput, latency
+percentiles, CPU time per request and peak RSS of the client process.
+
+    python -m benchmarks.bench_client --endpoint character_by_id --concurrency 1 8 64 --requests 2000
+"""
+import argparse
+import asyncio
+import resource
+import sys
+from time import perf_counter, process_time
+
+from pyxivapi import XIVAPIClient, XIVAPIResponseError
+from pyxivapi.instrumentation import HistogramSink, Instrumentation
+from pyxivapi.retry import RetryPolicy
+
+from .stub import StubOptions, StubServer
+
+ENDPOINTS = {
+    "character_by_id": lambda client, i: client.character_by_id(i, extended=True, include_achievements=True),
+    "index_search": lambda client, i: client.index_search(f'Item {i}', indexes=["Item"], columns=["ID", "Name"]),
+    "index_by_id": lambda client, i: client.index_by_id("Item", i, columns=["ID", "Name", "Icon"]),
+    "lore_search": lambda client, i: client.lore_search(f'query {i}'),
+    "lodestone_worldstatus": lambda client, i: client.lodestone_worldstatus(),
+}
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kibibytes on Linux and in bytes on macOS.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+async def run(base_url: str, endpoint: str, concurrency: int, requests: int, retry: bool) -> dict:
+    histogram = HistogramSink()
+    client = XIVAPIClient(
+        api_key="benchmark",
+        base_url=base_url,
+        instrumentation=Instrumentation([histogram]),
+        retry_policy=RetryPolicy(max_attempts=5, backoff_base=0.01) if retry else None
+    )
+    call = ENDPOINTS[endpoint]
+    remaining = iter(range(requests))
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for i in remaining:
+            try:
+                await call(client, i + 1)
+            except XIVAPIResponseError:
+                errors += 1
+
+    async with client:
+        # Warm up the connection pool so that opening connections does not count towards the measurement.
+        await asyncio.gather(*[call(client, 0) for _ in range(concurrency)], return_exceptions=True)
+        histogram.latencies.clear()
+
+        cpu = process_time()
+        started = perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = perf_counter() - started
+        cpu = process_time() - cpu
+
+    latencies = histogram.latencies[endpoint]
+    return {
+        "concurrency": concurrency,
+        "throughput": requests / elapsed,
+        "p50": latencies.percentile(50),
+        "p90": latencies.percentile(90),
+        "p99": latencies.percentile(99),
+        "cpu": cpu / requests,
+        "errors": errors,
+        "rss": peak_rss_mib(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="character_by_id")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument("--latency", type=float, default=0, help="seconds the stub waits before answering")
+    parser.add_argument("--payload-size", type=int, default=100, help="rows or achievements per response")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of 503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0, help="fraction of 429 responses")
+    parser.add_argument("--retry", action="store_true", help="retry failed requests")
+    args = parser.parse_args()
+
+    options = StubOptions(args.latency, args.payload_size, args.error_rate, args.rate_limit_rate)
+    with StubServer(options) as stub:
+        print(f'{args.endpoint}, {args.requests} requests per level, stub latency {args.latency}s, '
+              f'payload size {args.payload_size}')
+        print(f'{"concurrency":>12}{"req/s":>10}{"p50 ms":>10}{"p90 ms":>10}{"p99 ms":>10}{"CPU us/req":>12}'
+              f'{"errors":>8}{"peak RSS MiB":>14}')
+        for concurrency in args.concurrency:
+            result = asyncio.run(run(stub.base_url, args.endpoint, concurrency, args.requests, args.retry))
+            print(f'{result["concurrency"]:>12}{result["throughput"]:>10.0f}{result["p50"] * 1000:>10.2f}'
+                  f'{result["p90"] * 1000:>10.2f}{result["p99"] * 1000:>10.2f}{result["cpu"] * 1e6:>12.0f}'
+                  f'{result["errors"]:>8}{result["rss"]:>14.1f}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Compare decode time and peak memory of the response decoders on representative payloads.
+
+    python -m benchmarks.bench_decode
+"""
+import argparse
+import timeit
+import tracemalloc
+
+from pyxivapi.decoders import json_decoder, orjson, orjson_decoder
+
+from .fixtures import PAYLOADS, encoded
+
+
+def peak_memory(decoder, body: bytes) -> int:
+    tracemalloc.start()
+    try:
+        decoder(body)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200, help="decodes per measurement")
+    args = parser.parse_args()
+
+    decoders = {"json": json_decoder}
+    if orjson is not None:
+        decoders["orjson"] = orjson_decoder
+    decoders["raw"] = bytes
+
+    print(f'{"payload":<22}{"decoder":<10}{"size KiB":>10}{"us/decode":>12}{"peak KiB":>12}')
+    for name in PAYLOADS:
+        body = encoded(name)
+        for decoder_name, decoder in decoders.items():
+            seconds = min(timeit.repeat(lambda: decoder(body), number=args.number, repeat=5)) / args.number
+            peak = peak_memory(decoder, body)
+            print(f'{name:<22}{decoder_name:<10}{len(body) / 1024:>10.1f}{seconds * 1e6:>12.1f}{peak / 1024:>12.1f}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compare the memory retained by decoded dict responses and by the slotted models of pyxivapi.models.
+
+    python -m benchmarks.bench_models
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from pyxivapi.models import Character, IndexRow
+
+from .fixtures import character, index_search
+
+
+def retained(build, count: int) -> int:
+    """Bytes still allocated after keeping count objects made by build."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        kept = [build() for _ in range(count)]
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        del kept
+        return size
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--characters", type=int, default=200, help="character responses kept")
+    parser.add_argument("--rows", type=int, default=20000, help="index rows kept")
+    args = parser.parse_args()
+
+    character_body = json.dumps(character(achievements=500)).encode("utf-8")
+    rows_body = json.dumps(index_search(rows=args.rows, columns=8)).encode("utf-8")
+
+    def parsed(model):
+        # Sections are parsed into slotted models on first access, which is when most of the memory is saved.
+        for section in Character.sections:
+            getattr(model, section)
+        return model
+
+    cases = [
+        ("character dict", args.characters, lambda: json.loads(character_body)),
+        ("Character", args.characters, lambda: Character(json.loads(character_body))),
+        ("Character, parsed", args.characters, lambda: parsed(Character(json.loads(character_body)))),
+        ("index row dicts", 1, lambda: json.loads(rows_body)["Results"]),
+        ("IndexRow", 1, lambda: [IndexRow(row) for row in json.loads(rows_body)["Results"]]),
+    ]
+
+    print(f'{"kept":<24}{"count":>8}{"KiB":>12}{"bytes/object":>14}')
+    for name, count, build in cases:
+        size = retained(build, count)
+        objects = count if count > 1 else args.rows
+        print(f'{name:<24}{objects:>8}{size / 1024:>12.1f}{size / objects:>14.0f}')
+
+
+if __name__ == "__main__":
+    main()
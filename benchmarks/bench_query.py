@@ -0,0 +1,105 @@
+"""
+Compare the CPU time spent building the body and cache key of an index_search request,
+rebuilding the query on every call against binding a prepared SearchQuery.
+
+    python -m benchmarks.bench_query
+"""
+import argparse
+import json
+import timeit
+
+from pyxivapi import XIVAPIClient
+from pyxivapi.cache import make_cache_key
+from pyxivapi.models import Filter, Sort
+from pyxivapi.query import SearchQuery
+
+URL = "https://xivapi.com/search"
+PARAMS = {"language": "en"}
+
+
+def dict_body(name: str, page: int, indexes, columns, filters, sort, per_page: int, string_algo: str) -> dict:
+    """The body built by index_search before SearchQuery, kept here as the baseline."""
+    body = {
+        "indexes": ",".join(list(set(indexes))),
+        "columns": ",".join(list(set(columns))),
+        "body": {
+            "query": {
+                "bool": {
+                    "should": [{
+                        string_algo: {
+                            f'NameCombined_{language}': {
+                                "query": name,
+                                "fuzziness": "AUTO",
+                                "prefix_length": 1,
+                                "max_expansions": 50
+                            }
+                        }
+                    } for language in ("en", "de", "fr", "ja")],
+                    "filter": [{"range": {f.Field: {f.Comparison: f.Value}}} for f in filters]
+                }
+            },
+            "from": (page - 1) * per_page,
+            "size": per_page
+        }
+    }
+    if sort:
+        body["body"]["sort"] = [{sort.Field: "asc" if sort.Ascending else "desc"}]
+    return body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="calls per measurement")
+    parser.add_argument("--filters", type=int, default=2, help="range filters per query")
+    args = parser.parse_args()
+
+    indexes = ["Item", "Recipe", "Action"]
+    columns = ["ID", "Name", "Icon", "LevelItem", "ItemUICategory.Name"]
+    filters = [Filter(f'Field{i}', "gte", i) for i in range(args.filters)]
+    sort = Sort("LevelItem", False)
+    names = [f'omega {i}' for i in range(64)]
+
+    def legacy(i):
+        body = dict_body(names[i % 64], 1 + i % 5, indexes, columns, filters, sort, 100, "match")
+        # aiohttp encodes json= bodies with json.dumps, and the cache key hashes them again with sorted keys.
+        json.dumps(body).encode("utf-8")
+        make_cache_key("POST", URL, PARAMS, body)
+
+    def rebuilt(i):
+        query = SearchQuery(indexes, columns, filters, sort, per_page=100)
+        make_cache_key("POST", URL, PARAMS, query.body(names[i % 64], 1 + i % 5))
+
+    client = XIVAPIClient("benchmark")
+
+    def cached(i):
+        # What index_search does: SearchQuery compiled on first use, then reused.
+        query = client._search_query(indexes, columns, filters, sort, 100, "en", "match")
+        make_cache_key("POST", URL, PARAMS, query.body(names[i % 64], 1 + i % 5))
+
+    prepared_query = SearchQuery(indexes, columns, filters, sort, per_page=100)
+
+    def prepared(i):
+        make_cache_key("POST", URL, PARAMS, prepared_query.body(names[i % 64], 1 + i % 5))
+
+    def bind_only(i):
+        prepared_query.body(names[i % 64], 1 + i % 5)
+
+    cases = [
+        ("dict rebuilt per call", legacy),
+        ("SearchQuery per call", rebuilt),
+        ("index_search", cached),
+        ("prepared SearchQuery", prepared),
+        ("prepared, body only", bind_only),
+    ]
+
+    print(f'{"case":<24}{"us/call":>10}{"calls/s per core":>20}')
+    baseline = None
+    for name, case in cases:
+        counter = iter(range(10 ** 9))
+        seconds = min(timeit.repeat(lambda: case(next(counter)), number=args.number, repeat=5)) / args.number
+        baseline = baseline or seconds
+        print(f'{name:<24}{seconds * 1e6:>10.2f}{1 / seconds:>20,.0f}  ({baseline / seconds:.1f}x)')
+
+
+if __name__ == "__main__":
+    main()
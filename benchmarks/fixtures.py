@@ -0,0 +1,58 @@
+"""
+Synthetic payloads shaped like XIVAPI responses, used by the benchmarks so that they run without network access.
+"""
+import json
+import random
+
+
+def character(achievements: int = 2000, class_jobs: int = 30, seed: int = 0) -> dict:
+    """A character_by_id(extended=True, include_achievements=True, include_classjobs=True, ...) response."""
+    rng = random.Random(seed)
+    return {
+        "Character": {
+            "ID": 8255311,
+            "Name": "Lethys Lightpaw",
+            "Server": "Odin",
+            "DC": "Light",
+            "Bio": "-",
+            "ParseDate": 1600000000,
+            "ActiveClassJob": {"ClassID": 19, "JobID": 19, "Level": 80, "ExpLevel": 0, "ExpLevelMax": 0},
+            "ClassJobs": [{
+                "ClassID": i, "JobID": i, "Level": rng.randint(1, 80), "ExpLevel": rng.randint(0, 10 ** 6),
+                "ExpLevelMax": 10 ** 6, "ExpLevelTogo": rng.randint(0, 10 ** 6), "IsSpecialised": False,
+                "Name": f'class {i} / job {i}', "UnlockedState": {"ID": i, "Name": f'Job {i}'}
+            } for i in range(class_jobs)],
+            "GearSet": {"Gear": {slot: {"ID": rng.randint(1, 40000), "Materia": [], "Mirage": None} for slot in (
+                "Body", "Bracelets", "Earrings", "Feet", "Hands", "Head", "Legs", "MainHand", "Necklace", "Ring1", "Ring2"
+            )}},
+        },
+        "Achievements": {
+            "List": [{"ID": i, "Date": 1500000000 + rng.randint(0, 10 ** 8)} for i in range(achievements)],
+            "Points": achievements * 10,
+        },
+        "FreeCompany": None,
+        "Minions": [{"Name": f'minion {i}', "Icon": f'/i/004000/{i:06}.png'} for i in range(300)],
+        "Mounts": [{"Name": f'mount {i}', "Icon": f'/i/004000/{i:06}.png'} for i in range(150)],
+    }
+
+
+def index_search(rows: int = 100, columns: int = 30, seed: int = 0) -> dict:
+    """A wide index_search response."""
+    rng = random.Random(seed)
+    return {
+        "Pagination": {"Page": 1, "PageNext": 2, "PagePrev": None, "PageTotal": 10, "Results": rows,
+                       "ResultsPerPage": rows, "ResultsTotal": rows * 10},
+        "Results": [dict({"ID": i, "Name": f'Item {i}', "Icon": f'/i/020000/{i:06}.png'},
+                         **{f'Column{c}': rng.random() for c in range(columns)}) for i in range(rows)],
+        "SpeedMs": 12,
+    }
+
+
+PAYLOADS = {
+    "character_extended": character,
+    "index_search_wide": index_search,
+}
+
+
+def encoded(name: str) -> bytes:
+    return json.dumps(PAYLOADS[name]()).encode("utf-8")
@@ -0,0 +1,136 @@
+"""
+Local aiohttp server emulating the XIVAPI endpoints used by the benchmarks, so that they run without network access.
+
+    python -m benchmarks.stub --port 8080 --latency 0.02 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+
+from aiohttp import web
+
+from .fixtures import character, index_search
+
+
+class StubOptions:
+    """
+    Behaviour of the stub server.
+    Parameters
+    ------------
+    latency: float
+        Seconds to wait before answering each request. Defaults to 0.
+    payload_size: int
+        The number of rows in search results and of achievements in character profiles. Defaults to 100.
+    error_rate: float
+        The fraction of requests answered with a 503. Defaults to 0.
+    rate_limit_rate: float
+        The fraction of requests answered with a 429 and a Retry-After. Defaults to 0.
+    seed: int
+        Seed of the random error injection. Defaults to 0.
+    """
+
+    def __init__(self, latency: float = 0, payload_size: int = 100, error_rate: float = 0, rate_limit_rate: float = 0, seed: int = 0):
+        self.latency = latency
+        self.payload_size = payload_size
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.seed = seed
+
+
+def create_app(options: StubOptions) -> web.Application:
+    rng = random.Random(options.seed)
+
+    # Bodies are encoded once so that serving them costs as little CPU as possible.
+    bodies = {
+        "character": json.dumps(character(achievements=options.payload_size)).encode("utf-8"),
+        "search": json.dumps(index_search(rows=options.payload_size)).encode("utf-8"),
+        "row": json.dumps(index_search(rows=1)["Results"][0]).encode("utf-8"),
+        "lore": json.dumps(index_search(rows=options.payload_size, columns=2)).encode("utf-8"),
+        "worldstatus": json.dumps([{"Title": "All Worlds", "Status": "Online"}]).encode("utf-8"),
+    }
+
+    def handler(name):
+        async def handle(request):
+            if options.latency:
+                await asyncio.sleep(options.latency)
+
+            roll = rng.random()
+            if roll < options.rate_limit_rate:
+                return web.Response(status=429, headers={"Retry-After": "0"})
+            if roll < options.rate_limit_rate + options.error_rate:
+                return web.Response(status=503)
+
+            if request.method == "POST":
+                await request.read()
+            return web.Response(body=bodies[name], content_type="application/json")
+        return handle
+
+    app = web.Application()
+    app.router.add_get("/character/search", handler("search"))
+    app.router.add_get(r"/character/{id:\d+}", handler("character"))
+    app.router.add_get("/lore", handler("lore"))
+    app.router.add_get("/lodestone/worldstatus", handler("worldstatus"))
+    app.router.add_post("/search", handler("search"))
+    app.router.add_get(r"/{index}/{id:\d+}", handler("row"))
+    return app
+
+
+def serve(options: StubOptions, port: int = 0, ready=None) -> None:
+    """Run the stub server until the process is terminated, sending the bound port through ready once listening."""
+    async def run():
+        runner = web.AppRunner(create_app(options), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", port)
+        await site.start()
+        bound = site._server.sockets[0].getsockname()[1]
+        if ready is not None:
+            ready.send(bound)
+        else:
+            print(f'Serving on http://127.0.0.1:{bound}')
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+class StubServer:
+    """
+    Context manager running the stub server in a separate process, so that it does not weigh on the measurements
+    of the client. Its base_url is set once started.
+    """
+
+    def __init__(self, options: StubOptions):
+        self.options = options
+        self.base_url = None
+        self._process = None
+
+    def __enter__(self) -> "StubServer":
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.Process(target=serve, args=(self.options, 0, sender), daemon=True)
+        self._process.start()
+        if not receiver.poll(30):
+            self._process.terminate()
+            raise RuntimeError("The stub server did not start")
+        self.base_url = f'http://127.0.0.1:{receiver.recv()}'
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._process.terminate()
+        self._process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--payload-size", type=int, default=100)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    serve(StubOptions(args.latency, args.payload_size, args.error_rate, args.rate_limit_rate), args.port)
+
+
+if __name__ == "__main__":
+    main()
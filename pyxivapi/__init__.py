@@ -5,11 +5,13 @@ __copyright__ = 'Copyright 2019 (c) Lethys'
 __version__ = '0.5.0'
 
 from .client import XIVAPIClient
+from .sync import SyncXIVAPIClient
 from .exceptions import (
     XIVAPIForbidden,
     XIVAPIBadRequest,
     XIVAPINotFound,
     XIVAPIServiceUnavailable,
+    XIVAPITooManyRequests,
     XIVAPIInvalidLanguage,
     XIVAPIInvalidIndex,
     XIVAPIInvalidColumns,
@@ -17,5 +19,7 @@ from .exceptions import (
     XIVAPIInvalidWorlds,
     XIVAPIInvalidDatacenter,
     XIVAPIError,
-    XIVAPIInvalidAlgo
+    XIVAPIInvalidAlgo,
+    XIVAPIResponseError,
+    XIVAPICircuitOpen
 )
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+from time import monotonic
+from typing import Dict, Iterable, Optional
+
+from aiohttp import ClientConnectionError, ClientPayloadError
+
+from .exceptions import XIVAPICircuitOpen, XIVAPIResponseError
+
+__log__ = logging.getLogger(__name__)
+
+# Endpoints failing together share a circuit: Lodestone profiles and searches go down with Lodestone maintenance,
+# while game data is served by XIVAPI itself.
+ENDPOINT_FAMILIES = {
+    "character_search": "lodestone",
+    "character_by_id": "lodestone",
+    "freecompany_search": "lodestone",
+    "freecompany_by_id": "lodestone",
+    "linkshell_search": "lodestone",
+    "linkshell_by_id": "lodestone",
+    "pvpteam_search": "lodestone",
+    "pvpteam_by_id": "lodestone",
+    "lodestone_worldstatus": "lodestone",
+    "index_search": "search",
+    "index_by_id": "gamedata",
+    "index_by_ids": "gamedata",
+    "index_list": "gamedata",
+    "lore_search": "gamedata",
+    "patch_list": "gamedata",
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class _Circuit:
+    __slots__ = ("state", "failures", "successes", "opened_at", "trials", "round", "short_circuited")
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.successes = 0
+        self.opened_at = 0.0
+        self.trials = 0
+        # Numbers the half-open periods, telling their trial requests from older ones.
+        self.round = 0
+        self.short_circuited = 0
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to an endpoint family after consecutive failures, e.g. during Lodestone maintenance.
+    A circuit opens after failure_threshold consecutive failures, and calls then raise XIVAPICircuitOpen without a
+    request. After recovery_timeout seconds it goes half-open and lets half_open_calls trial requests through:
+    success_threshold successes close it again, and a failure opens it for another recovery_timeout.
+    Only outages count as failures: 5xx responses, connection errors and timeouts. Other responses, 4xx included,
+    show that XIVAPI is up.
+    Parameters
+    ------------
+    failure_threshold: int
+        The number of consecutive failures opening a circuit. Defaults to 5.
+    recovery_timeout: float
+        How long in seconds a circuit stays open before a trial request. Defaults to 30.
+    half_open_calls: int
+        The number of trial requests let through at once while half-open. Defaults to 1.
+    success_threshold: int
+        The number of successful trial requests closing a circuit. Defaults to 1.
+    statuses: Iterable[int]
+        The response statuses counted as failures. Defaults to 500, 502, 503 and 504.
+    families: Optional[Dict[str, str]]
+        The family of each endpoint, merged over ENDPOINT_FAMILIES. Endpoints without one get a circuit of their own.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30, half_open_calls: int = 1, success_threshold: int = 1,
+                 statuses: Iterable[int] = (500, 502, 503, 504), families: Optional[Dict[str, str]] = None):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_calls = half_open_calls
+        self.success_threshold = success_threshold
+        self.statuses = frozenset(statuses)
+        self.families = dict(ENDPOINT_FAMILIES)
+        if families:
+            self.families.update(families)
+
+        self._circuits: Dict[str, _Circuit] = {}
+
+    def family(self, endpoint: str) -> str:
+        return self.families.get(endpoint, endpoint)
+
+    def state(self, family: str) -> str:
+        """The state of a family's circuit: "closed", "open" or "half_open"."""
+        circuit = self._circuits.get(family)
+        if circuit is None:
+            return CLOSED
+        if circuit.state == OPEN and monotonic() - circuit.opened_at >= self.recovery_timeout:
+            return HALF_OPEN
+        return circuit.state
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {
+            family: {
+                "state": self.state(family),
+                "failures": circuit.failures,
+                "short_circuited": circuit.short_circuited,
+            } for family, circuit in self._circuits.items()
+        }
+
+    def is_failure(self, error: BaseException) -> bool:
+        if isinstance(error, XIVAPICircuitOpen):
+            return False
+        if isinstance(error, XIVAPIResponseError):
+            return error.status in self.statuses
+        return isinstance(error, (ClientConnectionError, ClientPayloadError, asyncio.TimeoutError))
+
+    def before(self, family: str) -> Optional[int]:
+        """
+        Let a request of the family through, or raise XIVAPICircuitOpen.
+        Returns a token for a trial request of a half-open circuit, None otherwise. Every request let through must be
+        followed by a call to record with that token.
+        """
+        circuit = self._circuits.get(family)
+        if circuit is None:
+            circuit = self._circuits[family] = _Circuit()
+
+        if circuit.state == CLOSED:
+            return None
+
+        if circuit.state == OPEN:
+            remaining = self.recovery_timeout - (monotonic() - circuit.opened_at)
+            if remaining > 0:
+                circuit.short_circuited += 1
+                raise XIVAPICircuitOpen(f'The circuit of {family} endpoints is open after repeated failures.', None, remaining)
+
+            __log__.info(f'Circuit of {family} endpoints is half-open')
+            circuit.state = HALF_OPEN
+            circuit.trials = 0
+            circuit.successes = 0
+            circuit.round += 1
+
+        if circuit.trials >= self.half_open_calls:
+            circuit.short_circuited += 1
+            raise XIVAPICircuitOpen(f'The circuit of {family} endpoints is waiting for a trial request.', None, None)
+        circuit.trials += 1
+        return circuit.round
+
+    def record(self, family: str, error: Optional[BaseException] = None, trial: Optional[int] = None) -> None:
+        """
+        Record the outcome of a request let through by before, error being None on success and trial the token
+        returned by before.
+        """
+        circuit = self._circuits[family]
+        # Requests let through before the circuit opened, or trials of an earlier half-open period, don't count.
+        is_trial = trial is not None and trial == circuit.round and circuit.state == HALF_OPEN
+        if is_trial:
+            circuit.trials -= 1
+
+        if isinstance(error, asyncio.CancelledError):
+            return
+
+        failed = error is not None and self.is_failure(error)
+        if circuit.state == CLOSED:
+            if not failed:
+                circuit.failures = 0
+                return
+            circuit.failures += 1
+            if circuit.failures >= self.failure_threshold:
+                self._open(family, circuit)
+            return
+
+        if not is_trial:
+            return
+
+        if failed:
+            circuit.failures += 1
+            self._open(family, circuit)
+            return
+
+        circuit.successes += 1
+        if circuit.successes >= self.success_threshold:
+            __log__.info(f'Circuit of {family} endpoints is closed')
+            circuit.state = CLOSED
+            circuit.failures = 0
+
+    def _open(self, family: str, circuit: _Circuit) -> None:
+        if circuit.state != OPEN:
+            __log__.warning(f'Opening the circuit of {family} endpoints for {self.recovery_timeout}s after {circuit.failures} failure(s)')
+        circuit.state = OPEN
+        circuit.opened_at = monotonic()
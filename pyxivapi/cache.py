@@ -0,0 +1,355 @@
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from email.utils import formatdate
+from time import monotonic, time
+from typing import Any, Dict, Optional, Union
+
+from yarl import URL
+
+__log__ = logging.getLogger(__name__)
+
+
+# Freshness lifetimes, in seconds, for each endpoint of XIVAPIClient.
+# Game data only changes on patch days whereas the world status can flip at any moment.
+DEFAULT_TTLS = {
+    "character_search": 300,
+    "character_by_id": 900,
+    "freecompany_search": 300,
+    "freecompany_by_id": 900,
+    "linkshell_search": 300,
+    "linkshell_by_id": 900,
+    "pvpteam_search": 300,
+    "pvpteam_by_id": 900,
+    "index_search": 3600,
+    "index_by_id": 86400,
+    "index_by_ids": 86400,
+    "index_list": 0,
+    "lore_search": 86400,
+    "lodestone_worldstatus": 60,
+    "patch_list": 3600,
+}
+
+# Query parameters which never take part in a cache key.
+IGNORED_PARAMS = ("private_key",)
+
+
+def make_cache_key(method: str, url: str, params: Optional[dict] = None, body: Union[dict, bytes, None] = None) -> str:
+    """
+    Build a cache key from a request.
+    The query string is merged with params, sorted and stripped of the API key so that the same resource
+    always maps onto the same key, regardless of which key or parameter order was used to request it.
+    """
+    url = URL(url)
+    query = [(k, v) for k, v in url.query.items() if k not in IGNORED_PARAMS]
+    if params:
+        query.extend((k, str(v)) for k, v in params.items() if k not in IGNORED_PARAMS)
+    query.sort()
+
+    key = f'{method.upper()} {url.with_query(None)}'
+    if query:
+        key += "?" + "&".join(f'{k}={v}' for k, v in query)
+
+    if body is not None:
+        if not isinstance(body, bytes):
+            body = json.dumps(body, sort_keys=True).encode("utf-8")
+        digest = hashlib.sha1(body).hexdigest()
+        key += f' #{digest}'
+
+    return key
+
+
+def _parse_date(value: Any) -> Optional[float]:
+    """
+    Find the time XIVAPI last parsed the Lodestone profile held in a decoded response.
+    Profiles carry a ParseDate next to their data, older payloads an Info section with an Updated time per profile.
+    """
+    if not isinstance(value, dict):
+        return None
+
+    dates = []
+    for section in value.values():
+        if isinstance(section, dict) and isinstance(section.get("ParseDate"), (int, float)):
+            dates.append(section["ParseDate"])
+
+    info = value.get("Info")
+    if isinstance(info, dict):
+        for section in info.values():
+            if isinstance(section, dict) and isinstance(section.get("Updated"), (int, float)):
+                dates.append(section["Updated"])
+
+    return max(dates) if dates else None
+
+
+def extract_validators(headers, value: Any = None) -> Dict[str, str]:
+    """
+    Collect the validators of a response: its ETag and Last-Modified headers.
+    Without a Last-Modified header, XIVAPI's own ParseDate / Info timestamps are used in its place.
+    """
+    validators = {}
+
+    etag = headers.get("ETag")
+    if etag:
+        validators["etag"] = etag
+
+    last_modified = headers.get("Last-Modified")
+    if not last_modified:
+        parse_date = _parse_date(value)
+        if parse_date is not None:
+            last_modified = formatdate(parse_date, usegmt=True)
+
+    if last_modified:
+        validators["last_modified"] = last_modified
+
+    return validators
+
+
+class CacheEntry:
+    """
+    A cached response.
+    Parameters
+    ------------
+    value: Any
+        The decoded response.
+    expires: float
+        The UNIX time after which the entry is no longer fresh.
+    size: int
+        The size in bytes of the response body, used to bound the memory used by a backend.
+    etag: Optional[str]
+        The ETag of the response, if any.
+    last_modified: Optional[str]
+        The Last-Modified date of the response, if known.
+    """
+
+    __slots__ = ("value", "expires", "size", "etag", "last_modified")
+
+    def __init__(self, value: Any, expires: float, size: int = 0, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self.value = value
+        self.expires = expires
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def fresh(self) -> bool:
+        return time() < self.expires
+
+    @property
+    def revalidatable(self) -> bool:
+        return self.etag is not None or self.last_modified is not None
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """
+        Headers asking XIVAPI to answer 304 Not Modified if the cached response is still current.
+        """
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class CacheBackend:
+    """
+    Interface for response cache storage.
+    Subclass and implement every coroutine to plug in a shared store, e.g. Redis or memcached.
+    """
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        """|coro|
+        Return the entry stored under key, or None.
+        """
+        raise NotImplementedError
+
+    async def set(self, key: str, entry: CacheEntry, ttl: Optional[float] = None) -> None:
+        """|coro|
+        Store entry under key. The backend may discard it after ttl seconds.
+        """
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        """|coro|
+        Remove the entry stored under key, if any.
+        """
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        """|coro|
+        Remove every entry.
+        """
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-memory LRU cache backend.
+    Parameters
+    ------------
+    max_entries: int
+        The maximum number of entries to keep. Defaults to 1024.
+    max_size: Optional[int]
+        The maximum total size in bytes of the cached response bodies. Unbounded by default.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_size: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+
+        entry, deadline = item
+        if deadline is not None and monotonic() >= deadline:
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry, ttl: Optional[float] = None) -> None:
+        if self.max_size is not None and entry.size > self.max_size:
+            return
+
+        self._remove(key)
+        self._entries[key] = (entry, monotonic() + ttl if ttl is not None else None)
+        self.size += entry.size
+
+        while len(self._entries) > self.max_entries or (self.max_size is not None and self.size > self.max_size):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        self._remove(key)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def _remove(self, key: str) -> None:
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self.size -= item[0].size
+
+
+class ResponseCache:
+    """
+    Response cache used by XIVAPIClient.
+    Parameters
+    ------------
+    backend: Optional[CacheBackend]
+        The storage backend. Defaults to a MemoryCache.
+    ttls: Optional[dict]
+        Freshness lifetimes in seconds keyed by XIVAPIClient method name, merged over DEFAULT_TTLS.
+        A lifetime of 0 disables caching for that endpoint.
+    default_ttl: float
+        The lifetime for endpoints missing from ttls. Defaults to 300.
+    stale_ttl: float
+        How long, past its freshness lifetime, a response carrying validators is kept to be revalidated
+        with a conditional request. Defaults to a day.
+    stale_while_revalidate: float
+        How long, past its freshness lifetime, a response is still returned at once while a fresh copy is fetched in
+        the background. Defaults to 0.
+    stale_if_error: float
+        How long, past its freshness lifetime, a response is returned in place of an error when XIVAPI is down or its
+        circuit is open. Defaults to 0.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 300, stale_ttl: float = 86400, stale_while_revalidate: float = 0, stale_if_error: float = 0):
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.stale = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "revalidations": self.revalidations, "stale": self.stale}
+
+    def _retention(self, entry: CacheEntry) -> float:
+        """How long past its freshness lifetime an entry is still of use."""
+        return max(self.stale_ttl if entry.revalidatable else 0, self.stale_while_revalidate, self.stale_if_error)
+
+    def serves_stale(self, entry: CacheEntry, error: bool = False) -> bool:
+        """
+        Whether a stale entry may be returned while it is refreshed, or in place of an error when error is True.
+        The entry is counted as served stale when it may.
+        """
+        window = self.stale_if_error if error else self.stale_while_revalidate
+        if time() - entry.expires > window:
+            return False
+        self.stale += 1
+        return True
+
+    def ttl_for(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        """|coro|
+        Return the entry stored under key, counting the lookup as a hit if it is fresh and a miss otherwise.
+        A stale entry is still returned when it can be revalidated, or served within the stale windows.
+        """
+        entry = await self.backend.get(key)
+        if entry is not None and entry.fresh:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        if entry is not None and (entry.revalidatable or time() - entry.expires <= self._retention(entry)):
+            return entry
+        return None
+
+    async def set(self, key: str, endpoint: str, value: Any, size: int = 0, headers=None) -> None:
+        """|coro|
+        Store a decoded response for the lifetime configured for endpoint, along with the validators found in
+        its headers.
+        """
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0:
+            return
+
+        validators = extract_validators(headers or {}, value)
+        entry = CacheEntry(value, time() + ttl, size, **validators)
+        await self.backend.set(key, entry, ttl + self._retention(entry))
+
+    async def revalidated(self, key: str, endpoint: str, entry: CacheEntry, headers=None) -> None:
+        """|coro|
+        Renew the freshness of entry after XIVAPI answered 304 Not Modified.
+        """
+        self.revalidations += 1
+
+        ttl = self.ttl_for(endpoint)
+        validators = extract_validators(headers or {})
+        renewed = CacheEntry(
+            entry.value, time() + ttl, entry.size,
+            etag=validators.get("etag", entry.etag),
+            last_modified=validators.get("last_modified", entry.last_modified)
+        )
+        await self.backend.set(key, renewed, ttl + self._retention(renewed))
+
+    async def clear(self) -> None:
+        """|coro|
+        Drop every cached response and reset the counters.
+        """
+        await self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.stale = 0
@@ -1,48 +1,269 @@
+import asyncio
 import logging
-from typing import List, Optional
+from collections import OrderedDict, deque
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
 
 from aiohttp import ClientSession
 
 from .exceptions import XIVAPIBadRequest, XIVAPIForbidden, XIVAPINotFound, XIVAPIServiceUnavailable, \
-    XIVAPIInvalidLanguage, XIVAPIError, XIVAPIInvalidIndex, XIVAPIInvalidColumns, XIVAPIInvalidAlgo
-from .decorators import timed
-from .models import Filter, Sort
+    XIVAPIInvalidLanguage, XIVAPIError, XIVAPIInvalidIndex, XIVAPIInvalidColumns, \
+    XIVAPITooManyRequests, XIVAPIResponseError
+from .breaker import CircuitBreaker
+from .cache import CacheEntry, ResponseCache, make_cache_key
+from .query import LANGUAGES, STRING_ALGOS, SearchQuery
+from .models import Character, CharacterSummary, Filter, FreeCompany, IndexRow, Linkshell, PvPTeam, RosterMember, SearchPage, Sort
+from .keys import KeyPool
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy, parse_retry_after
+from .scheduler import DEFAULT_PRIORITY, Scheduler
+from .decoders import default_decoder
+from .instrumentation import CallEvent, Instrumentation, Phases
+from .transport import TransportOptions
 
 __log__ = logging.getLogger(__name__)
 
+# Number of compiled SearchQuery kept for index_search calls repeating the same indexes, columns and filters.
+MAX_QUERIES = 64
+
+# Longest comma separated list of IDs sent in a single query string, keeping request URLs well under common limits.
+MAX_IDS_LENGTH = 1500
+
+
+def _chunk_ids(ids: Iterable[int], chunk_size: int) -> Iterator[List[str]]:
+    """Split IDs into unique chunks of at most chunk_size IDs and MAX_IDS_LENGTH characters once joined."""
+    chunk = []
+    length = 0
+    seen = set()
+    for content_id in ids:
+        content_id = str(content_id)
+        if content_id in seen:
+            continue
+        seen.add(content_id)
+
+        if chunk and (len(chunk) >= chunk_size or length + len(content_id) + 1 > MAX_IDS_LENGTH):
+            yield chunk
+            chunk = []
+            length = 0
+
+        chunk.append(content_id)
+        length += len(content_id) + 1
+
+    if chunk:
+        yield chunk
+
+
+_FREECOMPANY_FIELDS = FreeCompany.fields + tuple(section for section in FreeCompany.sections if section != "FreeCompanyMembers")
+
+# AchievementsPublic and FriendsPublic are fields of the Character model, but sit next to Character in responses.
+_CHARACTER_FIELDS = tuple(field for field in Character.fields if field not in ("AchievementsPublic", "FriendsPublic")) + \
+    ("ActiveClassJob", "ClassJobs", "ClassJobsBozjan", "ClassJobsElemental", "GearSet")
+
+# Top level sections of profile responses, mapped to the fields known under them (None when they aren't checked,
+# e.g. for lists) and to the data flag which adds the section to the response.
+CHARACTER_COLUMNS = {
+    "Character": (_CHARACTER_FIELDS, None),
+    "Achievements": (("Points", "List"), "AC"),
+    "AchievementsPublic": (None, "AC"),
+    "Minions": (None, "MIMO"),
+    "Mounts": (None, "MIMO"),
+    "Friends": (None, "FR"),
+    "FriendsPublic": (None, "FR"),
+    "FreeCompany": (_FREECOMPANY_FIELDS, "FC"),
+    "FreeCompanyMembers": (None, "FCM"),
+    "PvPTeam": (PvPTeam.fields + ("Crest",), "PVP"),
+}
+
+FREECOMPANY_COLUMNS = {
+    "FreeCompany": (_FREECOMPANY_FIELDS, None),
+    "FreeCompanyMembers": (None, "FCM"),
+}
+
+
+def _profile_columns(columns: Iterable[str], known: Dict[str, tuple], data: List[str]) -> str:
+    """
+    Check columns against the known sections and fields of a profile response, adding the data flags they need to
+    data. Returns the columns parameter.
+    """
+    for column in columns:
+        path = column.split(".")
+        if path[0] not in known:
+            raise XIVAPIInvalidColumns(f'"{column}" is not a valid column, columns must start with one of: {", ".join(known)}')
+
+        fields, flag = known[path[0]]
+        if fields is not None and len(path) > 1 and path[1] not in fields:
+            raise XIVAPIInvalidColumns(f'"{column}" is not a valid column, {path[1]} is not a field of {path[0]}')
+
+        if flag is not None and flag not in data:
+            data.append(flag)
+
+    return ",".join(sorted(set(columns)))
+
+
+# Fields of game data holding text, which XIVAPI has a suffixed column of per language, e.g. Name_fr.
+LOCALIZED_FIELDS = ("Name", "Description", "Singular", "Plural", "Text", "Help")
+
+
+def _localized(column: str, language: str) -> str:
+    """The column holding the language's value of column, e.g. ItemUICategory.Name_fr for ItemUICategory.Name."""
+    return f'{column}_{language}'
+
+
+def _localize(row: dict, columns: Iterable[str], language: str) -> dict:
+    """
+    Pick the language's values of columns from a row holding suffixed columns, falling back on the unsuffixed value
+    for columns which aren't localized, e.g. ID or Icon.
+    """
+    localized = {}
+    for column in columns:
+        path = column.split(".")
+        value = row
+        for key in path[:-1]:
+            value = value.get(key) if isinstance(value, dict) else None
+
+        if isinstance(value, dict):
+            value = value.get(_localized(path[-1], language), value.get(path[-1]))
+        else:
+            value = None
+
+        target = localized
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+    return localized
+
+
+def _page(response):
+    """The rows and Pagination section of a search response, whether it is a dict or a SearchPage."""
+    if isinstance(response, SearchPage):
+        return response.Results, {"PageTotal": response.PageTotal, "PageNext": response.PageNext}
+    return response.get("Results") or [], response.get("Pagination") or {}
+
+
+class _Call:
+    """
+    A call to an endpoint on its way through the cache, retries and rate limiter.
+    """
+
+    __slots__ = ("endpoint", "method", "url", "params", "json", "raw", "priority", "key", "entry", "event")
+
+    def __init__(self, endpoint: str, method: str, url: str, params: Optional[dict], json: Union[dict, bytes, None], raw: bool, priority: Optional[str] = None):
+        self.endpoint = endpoint
+        self.method = method
+        self.url = url
+        self.params = params
+        self.json = json
+        self.raw = raw
+        self.priority = priority
+        self.key: Optional[str] = None
+        self.entry: Optional[CacheEntry] = None
+        self.event: Optional[CallEvent] = None
+
+    def identity(self) -> str:
+        """The key shared by every call for the same resource and representation."""
+        key = make_cache_key(self.method, self.url, self.params, self.json)
+        return key + " #raw" if self.raw else key
+
 
 class XIVAPIClient:
     """
     Asynchronous client for accessing XIVAPI's endpoints.
     Parameters
     ------------
-    api_key: str
-        The API key used for identifying your application with XIVAPI.com.
+    api_key: Union[str, KeyPool]
+        The API key used for identifying your application with XIVAPI.com, or a KeyPool spreading requests over
+        several keys.
     session: Optional[ClientSession]
-        Optionally include your aiohttp session
+        Optionally include your aiohttp session. It is left open when the client is closed.
+    cache: Optional[ResponseCache]
+        Optionally cache responses. Cached responses are shared between callers and must not be mutated.
+        Stale responses are revalidated with conditional requests.
+    base_url: str
+        The root URL of XIVAPI. Defaults to https://xivapi.com
+    rate_limiter: Optional[RateLimiter]
+        Optionally throttle requests. Use RateLimiter.shared(api_key) to share one limiter between clients.
+    retry_policy: Optional[RetryPolicy]
+        Optionally retry requests which failed with a transient error, e.g. during Lodestone maintenance.
+    coalesce: bool
+        Whether identical concurrent requests share a single HTTP request and its result. Shared results must not
+        be mutated. Defaults to False.
+    transport: Optional[TransportOptions]
+        Connection pool and timeout settings of the session created by the client when none is given.
+    decoder: Optional[Callable[[bytes], Any]]
+        The function decoding response bodies. Defaults to orjson.loads when orjson is installed, json.loads otherwise.
+    models: bool
+        Whether to return slotted models from pyxivapi.models instead of dicts for characters, Free Companies,
+        Linkshells, PvPTeams, search pages and index rows. Defaults to False.
+    instrumentation: Optional[Instrumentation]
+        Optionally emit a CallEvent with the status, attempts and timings of every call. The connection phases
+        are only timed on a session given to the client if it was created with its trace config.
+    scheduler: Optional[Scheduler]
+        Optionally share request slots between priority classes, given per call with the priority parameter.
+    circuit_breaker: Optional[CircuitBreaker]
+        Optionally stop sending requests to endpoints failing repeatedly, raising XIVAPICircuitOpen instead. With a
+        cache allowing it, stale responses are served in place of the error.
     """
     base_url = "https://xivapi.com"
     languages = ["en", "fr", "de", "ja"]
 
-    def __init__(self, api_key: str, session: Optional[ClientSession] = None) -> None:
-        self.api_key = api_key
+    def __init__(self, api_key: Union[str, KeyPool], session: Optional[ClientSession] = None, cache: Optional[ResponseCache] = None, base_url: str = "https://xivapi.com", rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None, coalesce: bool = False, transport: Optional[TransportOptions] = None, decoder: Optional[Callable[[bytes], Any]] = None, models: bool = False, instrumentation: Optional[Instrumentation] = None, scheduler: Optional[Scheduler] = None, circuit_breaker: Optional[CircuitBreaker] = None) -> None:
+        self.key_pool = api_key if isinstance(api_key, KeyPool) else None
+        # With a pool, the key is chosen for each attempt in _send_with_key.
+        self.api_key = api_key.keys[0].key if self.key_pool is not None else api_key
         self._session = session
+        self._owns_session = session is None
+        self.transport = transport if transport is not None else TransportOptions()
+        self.decoder = decoder if decoder is not None else default_decoder()
+        self.models = models
+        self.instrumentation = instrumentation
+        if instrumentation is not None and session is not None and not instrumentation.traces(session):
+            __log__.warning("The session given to XIVAPIClient has no trace config of its instrumentation, "
+                            "DNS, connect and time-to-first-byte phases won't be recorded")
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.scheduler = scheduler
+        self.circuit_breaker = circuit_breaker
 
-        self.base_url = "https://xivapi.com"
-        self.languages = ["en", "fr", "de", "ja"]
-        self.string_algos = [
-            "custom", "wildcard", "wildcard_plus", "fuzzy", "term", "prefix", "match", "match_phrase",
-            "match_phrase_prefix", "multi_match", "query_string"
-        ]
+        self.coalesce = coalesce
+        self.coalesced = 0
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Dict[str, asyncio.Future] = {}
+        self._queries: "OrderedDict[tuple, SearchQuery]" = OrderedDict()
+
+        self.base_url = base_url.rstrip("/")
+        self.languages = list(LANGUAGES)
+        self.string_algos = list(STRING_ALGOS)
 
     @property
     def session(self) -> ClientSession:
         if self._session is None or self._session.closed:
-            self._session = ClientSession()
+            trace_configs = [self.instrumentation.trace_config()] if self.instrumentation is not None else []
+            self._session = self.transport.create_session(trace_configs=trace_configs)
+            self._owns_session = True
         return self._session
 
-    @timed
-    async def character_search(self, world, forename, surname, page=1):
+    async def close(self) -> None:
+        """|coro|
+        Cancel background refreshes of stale responses, then close the session created by the client, if any.
+        """
+        if self._refreshing:
+            # A refresh running after the session is closed would open a new one through the session property.
+            refreshes = list(self._refreshing.values())
+            for task in refreshes:
+                task.cancel()
+            await asyncio.gather(*refreshes, return_exceptions=True)
+
+        if self._owns_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self) -> "XIVAPIClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def character_search(self, world, forename, surname, page=1, raw=False, priority=None):
         """|coro|
         Search for character data directly from the Lodestone.
         Parameters
@@ -55,13 +276,32 @@ class XIVAPIClient:
             The character's surname.
         Optional[page: int]
             The page of results to return. Defaults to 1.
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
         """
-        url = f'{self.base_url}/character/search?name={forename}%20{surname}&server={world}&page={page}&private_key={self.api_key}'
-        async with self.session.get(url) as response:
-            return await self.process_response(response)
+        params = {
+            "private_key": self.api_key,
+            "name": f'{forename} {surname}',
+            "server": world,
+            "page": page
+        }
+
+        url = f'{self.base_url}/character/search'
+        result = await self._request("character_search", url, params=params, raw=raw, priority=priority)
+        return self._parse(SearchPage, result, raw, CharacterSummary)
 
-    @timed
-    async def character_by_id(self, lodestone_id: int, extended=False, include_achievements=False, include_minions_mounts=False, include_classjobs=False, include_friendslist=False, include_freecompany=False, include_freecompany_members=False, include_pvpteam=False, language="en"):
+    def iter_character_search(self, world, forename, surname, page=1, prefetch=2, priority=None):
+        """
+        Iterate over every character matching a search, fetching pages lazily.
+        Takes the same parameters as character_search, page being the first page to fetch, plus:
+        Optional[prefetch: int]
+            The number of pages fetched ahead of the one being consumed. Defaults to 2.
+        """
+        return self._paginate(lambda p: self.character_search(world, forename, surname, page=p, priority=priority), page, prefetch)
+
+    async def character_by_id(self, lodestone_id: int, extended=False, include_achievements=False, include_minions_mounts=False, include_classjobs=False, include_friendslist=False, include_freecompany=False, include_freecompany_members=False, include_pvpteam=False, columns=(), language="en", raw=False, priority=None):
         """|coro|
         Request character data from XIVAPI.com
         Please see XIVAPI documentation for more information about character sync state https://xivapi.com/docs/Character#character
@@ -69,8 +309,20 @@ class XIVAPIClient:
         ------------
         lodestone_id: int
             The character's Lodestone ID.
+        Optional[columns: list]
+            Dotted paths of the only fields to return, e.g. ["Character.ActiveClassJob", "FreeCompany.Rank"].
+            Sections such as FreeCompany are requested automatically when a column needs them.
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
         """
+        url, params = self._character_request(lodestone_id, extended, include_achievements, include_minions_mounts, include_classjobs, include_friendslist, include_freecompany, include_freecompany_members, include_pvpteam, columns, language)
+        result = await self._request("character_by_id", url, params=params, raw=raw, priority=priority)
+        return self._parse(Character, result, raw)
 
+    def _character_request(self, lodestone_id: int, extended=False, include_achievements=False, include_minions_mounts=False, include_classjobs=False, include_friendslist=False, include_freecompany=False, include_freecompany_members=False, include_pvpteam=False, columns=(), language="en"):
+        """The URL and query parameters of a character_by_id request."""
         params = {
             "private_key": self.api_key,
             "language": language
@@ -104,15 +356,15 @@ class XIVAPIClient:
         if include_pvpteam is True:
             data.append("PVP")
 
+        if len(columns) > 0:
+            params["columns"] = _profile_columns(columns, CHARACTER_COLUMNS, data)
+
         if len(data) > 0:
             params["data"] = ",".join(data)
 
-        url = f'{self.base_url}/character/{lodestone_id}'
-        async with self.session.get(url, params=params) as response:
-            return await self.process_response(response)
+        return f'{self.base_url}/character/{lodestone_id}', params
 
-    @timed
-    async def freecompany_search(self, world, name, page=1):
+    async def freecompany_search(self, world, name, page=1, raw=False, priority=None):
         """|coro|
         Search for Free Company data directly from the Lodestone.
         Parameters
@@ -123,13 +375,32 @@ class XIVAPIClient:
             The Free Company's name.
         Optional[page: int]
             The page of results to return. Defaults to 1.
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
         """
-        url = f'{self.base_url}/freecompany/search?name={name}&server={world}&page={page}&private_key={self.api_key}'
-        async with self.session.get(url) as response:
-            return await self.process_response(response)
+        params = {
+            "private_key": self.api_key,
+            "name": name,
+            "server": world,
+            "page": page
+        }
 
-    @timed
-    async def freecompany_by_id(self, lodestone_id: int, extended=False, include_freecompany_members=False):
+        url = f'{self.base_url}/freecompany/search'
+        result = await self._request("freecompany_search", url, params=params, raw=raw, priority=priority)
+        return self._parse(SearchPage, result, raw)
+
+    def iter_freecompany_search(self, world, name, page=1, prefetch=2, priority=None):
+        """
+        Iterate over every Free Company matching a search, fetching pages lazily.
+        Takes the same parameters as freecompany_search, page being the first page to fetch, plus:
+        Optional[prefetch: int]
+            The number of pages fetched ahead of the one being consumed. Defaults to 2.
+        """
+        return self._paginate(lambda p: self.freecompany_search(world, name, page=p, priority=priority), page, prefetch)
+
+    async def freecompany_by_id(self, lodestone_id: int, extended=False, include_freecompany_members=False, columns=(), raw=False, priority=None):
         """|coro|
         Request Free Company data from XIVAPI.com by Lodestone ID
         Please see XIVAPI documentation for more information about Free Company info at https://xivapi.com/docs/Free-Company#profile
@@ -137,6 +408,13 @@ class XIVAPIClient:
         ------------
         lodestone_id: int
             The Free Company's Lodestone ID.
+        Optional[columns: list]
+            Dotted paths of the only fields to return, e.g. ["FreeCompany.Rank", "FreeCompanyMembers"].
+            The members are requested automatically when a column needs them.
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
         """
 
         params = {
@@ -150,15 +428,89 @@ class XIVAPIClient:
         if include_freecompany_members is True:
             data.append("FCM")
 
+        if len(columns) > 0:
+            params["columns"] = _profile_columns(columns, FREECOMPANY_COLUMNS, data)
+
         if len(data) > 0:
             params["data"] = ",".join(data)
 
         url = f'{self.base_url}/freecompany/{lodestone_id}'
-        async with self.session.get(url, params=params) as response:
-            return await self.process_response(response)
+        result = await self._request("freecompany_by_id", url, params=params, raw=raw, priority=priority)
+        return self._parse(FreeCompany, result, raw)
 
-    @timed
-    async def linkshell_search(self, world, name, page=1):
+    async def freecompany_roster(self, lodestone_id: int, columns=(), language="en", concurrency=8, cached=True, progress=None, priority=None):
+        """|coro|
+        Request the profile of every member of a Free Company.
+        Returns a dict of RosterMember keyed by Lodestone ID, members whose profile couldn't be fetched included.
+        Parameters
+        ------------
+        lodestone_id: int
+            The Free Company's Lodestone ID.
+        Optional[columns: list]
+            Dotted paths of the only fields of each profile to return, e.g. ["Character.Name", "Character.ActiveClassJob"].
+            Takes the same columns as character_by_id.
+        Optional[language: str]
+            The two character length language code that indicates the language to return the profiles in. Defaults to English (en).
+        Optional[concurrency: int]
+            The maximum number of profiles requested at the same time. Defaults to 8.
+        Optional[cached: bool]
+            Whether members whose profile is fresh in the cache are returned. They are never requested. Defaults to True.
+        Optional[progress: Callable[[int, int, int], None]]
+            Called after every member with the number of members done, the number of members and the number of failures.
+        Optional[priority: str]
+            The priority class of the requests when the client has a scheduler, e.g. "bulk". Defaults to "normal".
+        """
+        return {member.ID: member async for member in self.iter_freecompany_roster(lodestone_id, columns, language, concurrency, cached, progress, priority)}
+
+    async def iter_freecompany_roster(self, lodestone_id: int, columns=(), language="en", concurrency=8, cached=True, progress=None, priority=None):
+        """
+        Request the profile of every member of a Free Company, yielding a RosterMember as each profile arrives.
+        Members whose profile is fresh in the cache are yielded without a request, usually ahead of the others. A
+        member whose profile can't be fetched is yielded with the error, and the rest of the roster is still fetched.
+        Takes the same parameters as freecompany_roster.
+        """
+        # Check the columns and language before any request.
+        self._character_request(0, columns=columns, language=language)
+
+        body = await self.freecompany_by_id(lodestone_id, columns=["FreeCompanyMembers"], raw=True, priority=priority)
+        members = self.decoder(body).get("FreeCompanyMembers") or []
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(member):
+            async with semaphore:
+                try:
+                    # Looked up here rather than up front, so a remote cache backend's lookups overlap the fetches.
+                    url, params = self._character_request(member["ID"], columns=columns, language=language)
+                    profile = await self._cached("character_by_id", url, params)
+                    if profile is not None:
+                        return RosterMember(member, self._parse(Character, profile, False), cached=True)
+                    profile = await self.character_by_id(member["ID"], columns=columns, language=language, priority=priority)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    __log__.warning(f'Could not fetch the profile of Free Company member {member["ID"]}: {e!r}')
+                    return RosterMember(member, error=e)
+            return RosterMember(member, profile)
+
+        total = len(members)
+        done = 0
+        failed = 0
+        tasks = [asyncio.ensure_future(fetch(member)) for member in members]
+        try:
+            for task in asyncio.as_completed(tasks):
+                member = await task
+                done += 1
+                failed += member.error is not None
+                if progress is not None:
+                    progress(done, total, failed)
+                if cached or not member.cached:
+                    yield member
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def linkshell_search(self, world, name, page=1, raw=False, priority=None):
         """|coro|
         Search for Linkshell data directly from the Lodestone.
         Parameters
@@ -169,26 +521,52 @@ class XIVAPIClient:
             The Linkshell's name.
         Optional[page: int]
             The page of results to return. Defaults to 1.
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
         """
-        url = f'{self.base_url}/linkshell/search?name={name}&server={world}&page={page}&private_key={self.api_key}'
-        async with self.session.get(url) as response:
-            return await self.process_response(response)
+        params = {
+            "private_key": self.api_key,
+            "name": name,
+            "server": world,
+            "page": page
+        }
+
+        url = f'{self.base_url}/linkshell/search'
+        result = await self._request("linkshell_search", url, params=params, raw=raw, priority=priority)
+        return self._parse(SearchPage, result, raw)
+
+    def iter_linkshell_search(self, world, name, page=1, prefetch=2, priority=None):
+        """
+        Iterate over every Linkshell matching a search, fetching pages lazily.
+        Takes the same parameters as linkshell_search, page being the first page to fetch, plus:
+        Optional[prefetch: int]
+            The number of pages fetched ahead of the one being consumed. Defaults to 2.
+        """
+        return self._paginate(lambda p: self.linkshell_search(world, name, page=p, priority=priority), page, prefetch)
 
-    @timed
-    async def linkshell_by_id(self, lodestone_id: int):
+    async def linkshell_by_id(self, lodestone_id: int, raw=False, priority=None):
         """|coro|
         Request Linkshell data from XIVAPI.com by Lodestone ID
         Parameters
         ------------
         lodestone_id: int
             The Linkshell's Lodestone ID.
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
         """
-        url = f'{self.base_url}/linkshell/{lodestone_id}?private_key={self.api_key}'
-        async with self.session.get(url) as response:
-            return await self.process_response(response)
+        params = {
+            "private_key": self.api_key
+        }
+
+        url = f'{self.base_url}/linkshell/{lodestone_id}'
+        result = await self._request("linkshell_by_id", url, params=params, raw=raw, priority=priority)
+        return self._parse(Linkshell, result, raw)
 
-    @timed
-    async def pvpteam_search(self, world, name, page=1):
+    async def pvpteam_search(self, world, name, page=1, raw=False, priority=None):
         """|coro|
         Search for PvPTeam data directly from the Lodestone.
         Parameters
@@ -199,26 +577,52 @@ class XIVAPIClient:
             The PvPTeam's name.
         Optional[page: int]
             The page of results to return. Defaults to 1.
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
         """
-        url = f'{self.base_url}/pvpteam/search?name={name}&server={world}&page={page}&private_key={self.api_key}'
-        async with self.session.get(url) as response:
-            return await self.process_response(response)
+        params = {
+            "private_key": self.api_key,
+            "name": name,
+            "server": world,
+            "page": page
+        }
 
-    @timed
-    async def pvpteam_by_id(self, lodestone_id):
+        url = f'{self.base_url}/pvpteam/search'
+        result = await self._request("pvpteam_search", url, params=params, raw=raw, priority=priority)
+        return self._parse(SearchPage, result, raw)
+
+    def iter_pvpteam_search(self, world, name, page=1, prefetch=2, priority=None):
+        """
+        Iterate over every PvPTeam matching a search, fetching pages lazily.
+        Takes the same parameters as pvpteam_search, page being the first page to fetch, plus:
+        Optional[prefetch: int]
+            The number of pages fetched ahead of the one being consumed. Defaults to 2.
+        """
+        return self._paginate(lambda p: self.pvpteam_search(world, name, page=p, priority=priority), page, prefetch)
+
+    async def pvpteam_by_id(self, lodestone_id, raw=False, priority=None):
         """|coro|
         Request PvPTeam data from XIVAPI.com by Lodestone ID
         Parameters
         ------------
         lodestone_id: str
             The PvPTeam's Lodestone ID.
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
         """
-        url = f'{self.base_url}/pvpteam/{lodestone_id}?private_key={self.api_key}'
-        async with self.session.get(url) as response:
-            return await self.process_response(response)
+        params = {
+            "private_key": self.api_key
+        }
+
+        url = f'{self.base_url}/pvpteam/{lodestone_id}'
+        result = await self._request("pvpteam_by_id", url, params=params, raw=raw, priority=priority)
+        return self._parse(PvPTeam, result, raw)
 
-    @timed
-    async def index_search(self, name, indexes=(), columns=(), filters: List[Filter] = (), sort: Sort = None, page=1, per_page=10, language="en", string_algo="match"):
+    async def index_search(self, name, indexes=(), columns=(), filters: List[Filter] = (), sort: Sort = None, page=1, per_page=10, language="en", string_algo="match", raw=False, priority=None):
         """|coro|
         Search for data from on specific indexes.
         Parameters
@@ -232,7 +636,7 @@ class XIVAPIClient:
             A named list of columns to return in the response. ID, Name, Icon & ItemDescription will be returned by default.
             e.g. ["ID", "Name", "Icon"]
         Optional[filters: list]
-            A list of type Filter. Filter must be initialised with Field, Comparison (e.g. lt, lte, gt, gte) and value.
+            A list of type Filter. Filter must be initialised with Field, Comparison (e.g. lt, lte, gt, gte, eq, ne, in) and value.
             e.g. filters = [ Filter("LevelItem", "gte", 100) ]
         Optional[sort: Sort]
             The name of the column to sort on.
@@ -245,97 +649,78 @@ class XIVAPIClient:
             The search algorithm to use for string matching (default = "match")
             Valid values are "custom", "wildcard", "wildcard_plus", "fuzzy", "term", "prefix", "match", "match_phrase",
             "match_phrase_prefix", "multi_match", "query_string"
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
         """
 
-        if len(indexes) == 0:
-            raise XIVAPIInvalidIndex("Please specify at least one index to search for, e.g. [\"Recipe\"]")
+        query = self._search_query(indexes, columns, filters, sort, per_page, language, string_algo)
+        return await self.index_search_query(query, name, page, raw, priority)
 
-        if language.lower() not in self.languages:
-            raise XIVAPIInvalidLanguage(f'"{language}" is not a valid language code for XIVAPI.')
+    async def index_search_query(self, query: SearchQuery, name, page=1, raw=False, priority=None):
+        """|coro|
+        Search for data with a prepared SearchQuery, only binding the name and page to its serialized body.
+        Parameters
+        ------------
+        query: SearchQuery
+            The indexes, columns, filters, sort and string algorithm of the search.
+        name: str
+            The name to search for.
+        Optional[page: int]
+            The page of results to return. Defaults to 1.
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
+        """
+        params = {
+            "private_key": self.api_key,
+            "language": query.language
+        }
 
-        if len(columns) == 0:
-            raise XIVAPIInvalidColumns("Please specify at least one column to return in the resulting data.")
+        url = f'{self.base_url}/search'
+        result = await self._request("index_search", url, params=params, method="POST", json=query.body(name, page), raw=raw, priority=priority)
+        return self._parse(SearchPage, result, raw)
 
-        if string_algo not in self.string_algos:
-            raise XIVAPIInvalidAlgo(f'"{string_algo}" is not a supported string_algo for XIVAPI')
-
-        body = {
-            "indexes": ",".join(list(set(indexes))),
-            "columns": "ID",
-            "body": {
-                "query": {
-                    "bool": {
-                        "should": [{
-                            string_algo: {
-                                "NameCombined_en": {
-                                    "query": name,
-                                    "fuzziness": "AUTO",
-                                    "prefix_length": 1,
-                                    "max_expansions": 50
-                                }
-                            }
-                        }, {
-                            string_algo: {
-                                "NameCombined_de": {
-                                    "query": name,
-                                    "fuzziness": "AUTO",
-                                    "prefix_length": 1,
-                                    "max_expansions": 50
-                                }
-                            }
-                        }, {
-                            string_algo: {
-                                "NameCombined_fr": {
-                                    "query": name,
-                                    "fuzziness": "AUTO",
-                                    "prefix_length": 1,
-                                    "max_expansions": 50
-                                }
-                            }
-                        }, {
-                            string_algo: {
-                                "NameCombined_ja": {
-                                    "query": name,
-                                    "fuzziness": "AUTO",
-                                    "prefix_length": 1,
-                                    "max_expansions": 50
-                                }
-                            }
-                        }]
-                    }
-                },
-                "from": (page * per_page),
-                "size": per_page
-            }
-        }
+    def _search_query(self, indexes, columns, filters, sort, per_page, language, string_algo) -> SearchQuery:
+        """The SearchQuery for these parameters, compiled once and reused by later searches."""
+        key = (
+            tuple(indexes), tuple(columns), tuple((f.Field, f.Comparison, repr(f.Value)) for f in filters),
+            (sort.Field, sort.Ascending) if sort else None, per_page, language, string_algo
+        )
+        query = self._queries.get(key)
+        if query is None:
+            query = SearchQuery(indexes, columns, filters, sort, per_page=per_page, language=language, string_algo=string_algo)
+            self._queries[key] = query
+            if len(self._queries) > MAX_QUERIES:
+                self._queries.popitem(last=False)
+        else:
+            self._queries.move_to_end(key)
+        return query
 
-        if len(columns) > 0:
-            body["columns"] = ",".join(list(set(columns)))
-
-        if len(filters) > 0:
-            filts = []
-            for f in filters:
-                filts.append({
-                    "range": {
-                        f.Field: {
-                            f.Comparison: f.Value
-                        }
-                    }
-                })
-
-            body["body"]["query"]["bool"]["filter"] = filts
-
-        if sort:
-            body["body"]["sort"] = [{
-                sort.Field: "asc" if sort.Ascending else "desc"
-            }]
-
-        url = f'{self.base_url}/search?language={language}&private_key={self.api_key}'
-        async with self.session.post(url, json=body) as response:
-            return await self.process_response(response)
-
-    @timed
-    async def index_by_id(self, index, content_id: int, columns=(), language="en"):
+    def iter_index_search_query(self, query: SearchQuery, name, page=1, prefetch=2, priority=None):
+        """
+        Iterate over every row matching a prepared SearchQuery, fetching pages lazily.
+        Takes the same parameters as index_search_query, page being the first page to fetch, plus:
+        Optional[prefetch: int]
+            The number of pages fetched ahead of the one being consumed. Defaults to 2.
+        """
+        return self._paginate(lambda p: self.index_search_query(query, name, p, priority=priority), page, prefetch)
+
+    def iter_index_search(self, name, indexes=(), columns=(), filters: List[Filter] = (), sort: Sort = None, page=1, per_page=100, language="en", string_algo="match", prefetch=2, priority=None):
+        """
+        Iterate over every row matching a search on specific indexes, fetching pages lazily.
+        Takes the same parameters as index_search, page being the first page to fetch, plus:
+        Optional[prefetch: int]
+            The number of pages fetched ahead of the one being consumed. Defaults to 2.
+        """
+        return self._paginate(
+            lambda p: self.index_search(name, indexes, columns, filters, sort, p, per_page, language, string_algo, priority=priority),
+            page, prefetch
+        )
+
+    async def index_by_id(self, index, content_id: int, columns=(), language="en", raw=False, priority=None):
         """|coro|
         Request data from a given index by ID.
         Parameters
@@ -350,6 +735,10 @@ class XIVAPIClient:
         Optional[language: str]
             The two character length language code that indicates the language to return the response in. Defaults to English (en).
             Valid values are "en", "fr", "de" & "ja"
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
         """
         if index == "":
             raise XIVAPIInvalidIndex("Please specify an index to search on, e.g. \"Item\"")
@@ -366,11 +755,182 @@ class XIVAPIClient:
             params["columns"] = ",".join(list(set(columns)))
 
         url = f'{self.base_url}/{index}/{content_id}'
-        async with self.session.get(url, params=params) as response:
-            return await self.process_response(response)
+        result = await self._request("index_by_id", url, params=params, raw=raw, priority=priority)
+        return self._parse(IndexRow, result, raw)
 
-    @timed
-    async def lore_search(self, query, language="en"):
+    async def index_by_id_localized(self, index, content_id: int, columns=(), languages=None, localized=None, fan_out=False, priority=None):
+        """|coro|
+        Request data from a given index by ID in several languages at once, returning a row per language code.
+        Suffixed columns such as Name_fr are requested for the localized columns in a single request, the other
+        columns keeping the same value in each language.
+        Parameters
+        ------------
+        index: str
+            The index to which the content is attributed.
+        content_id: int
+            The ID of the content
+        columns: list
+            A named list of columns to return in the response, e.g. ["ID", "Name", "Description"].
+        Optional[languages: list]
+            The language codes to return. Defaults to every language.
+        Optional[localized: list]
+            The columns which have a value per language, e.g. ["Name", "Description"]. Defaults to the columns
+            ending with a field of LOCALIZED_FIELDS: Name, Description, Singular, Plural, Text or Help, e.g.
+            ItemUICategory.Name.
+        Optional[fan_out: bool]
+            Send one index_by_id request per language concurrently instead, sharing their cache entries with
+            single language calls. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
+        """
+        languages = list(languages) if languages is not None else self.languages
+        for language in languages:
+            if language not in self.languages:
+                raise XIVAPIInvalidLanguage(f'"{language}" is not a valid language code for XIVAPI.')
+
+        if fan_out:
+            rows = await asyncio.gather(*(self.index_by_id(index, content_id, columns, language, priority=priority) for language in languages))
+            return dict(zip(languages, rows))
+
+        if index == "":
+            raise XIVAPIInvalidIndex("Please specify an index to search on, e.g. \"Item\"")
+
+        if len(columns) == 0:
+            raise XIVAPIInvalidColumns("Please specify at least one column to return in the resulting data.")
+
+        requested = set(columns)
+        if localized is None:
+            localized = [column for column in columns if column.split(".")[-1] in LOCALIZED_FIELDS]
+        requested.update(_localized(column, language) for column in localized for language in languages)
+
+        params = {
+            "private_key": self.api_key,
+            "columns": ",".join(sorted(requested))
+        }
+
+        url = f'{self.base_url}/{index}/{content_id}'
+        result = await self._request("index_by_id", url, params=params, priority=priority)
+        return {language: self._parse(IndexRow, _localize(result, columns, language), False) for language in languages}
+
+    async def index_by_ids(self, index, ids, columns=(), language="en", chunk_size=100, concurrency=4, priority=None):
+        """|coro|
+        Request data for many IDs of a given index, fetching them in chunks through the index's list endpoint.
+        Returns a dict of rows keyed by ID. IDs which don't exist are left out.
+        Parameters
+        ------------
+        index: str
+            The index to which the content is attributed.
+        ids: Iterable[int]
+            The IDs of the content.
+        Optional[columns: list]
+            A named list of columns to return in the response. ID is always returned.
+            e.g. ["ID", "Name", "Icon"]
+        Optional[language: str]
+            The two character length language code that indicates the language to return the response in. Defaults to English (en).
+            Valid values are "en", "fr", "de" & "ja"
+        Optional[chunk_size: int]
+            The maximum number of IDs requested at once. Defaults to 100.
+        Optional[concurrency: int]
+            The maximum number of chunks requested at the same time. Defaults to 4.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
+        """
+        return {content_id: row async for content_id, row in self.iter_index_by_ids(index, ids, columns, language, chunk_size, concurrency, priority)}
+
+    async def iter_index_by_ids(self, index, ids, columns=(), language="en", chunk_size=100, concurrency=4, priority=None):
+        """
+        Request data for many IDs of a given index, yielding (ID, row) pairs as each chunk arrives.
+        Takes the same parameters as index_by_ids.
+        """
+        if index == "":
+            raise XIVAPIInvalidIndex("Please specify an index to search on, e.g. \"Item\"")
+
+        if len(columns) == 0:
+            raise XIVAPIInvalidColumns("Please specify at least one column to return in the resulting data.")
+
+        if language.lower() not in self.languages:
+            raise XIVAPIInvalidLanguage(f'"{language}" is not a valid language code for XIVAPI.')
+
+        columns = set(columns)
+        columns.add("ID")
+        columns = ",".join(sorted(columns))
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(chunk):
+            params = {
+                "private_key": self.api_key,
+                "language": language,
+                "ids": ",".join(chunk),
+                "columns": columns,
+                "limit": len(chunk)
+            }
+
+            async with semaphore:
+                return await self._request("index_by_ids", f'{self.base_url}/{index}', params=params, priority=priority)
+
+        tasks = [asyncio.ensure_future(fetch(chunk)) for chunk in _chunk_ids(ids, chunk_size)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                response = await task
+                for row in response.get("Results") or ():
+                    yield row["ID"], self._parse(IndexRow, row, False)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def index_list(self, index, columns=(), page=1, limit=100, language="en", raw=False, priority=None):
+        """|coro|
+        Request a page of the rows of a given index, in ID order.
+        Parameters
+        ------------
+        index: str
+            The index to list, e.g. "Item".
+        Optional[columns: list]
+            A named list of columns to return in the response. ID & Name will be returned by default.
+            e.g. ["ID", "Name", "Icon"]
+        Optional[page: int]
+            The page of results to return. Defaults to 1.
+        Optional[limit: int]
+            The number of rows per page, up to 3000. Defaults to 100.
+        Optional[language: str]
+            The two character length language code that indicates the language to return the response in. Defaults to English (en).
+            Valid values are "en", "fr", "de" & "ja"
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
+        """
+        if index == "":
+            raise XIVAPIInvalidIndex("Please specify an index to list, e.g. \"Item\"")
+
+        if language.lower() not in self.languages:
+            raise XIVAPIInvalidLanguage(f'"{language}" is not a valid language code for XIVAPI.')
+
+        params = {
+            "private_key": self.api_key,
+            "language": language,
+            "page": page,
+            "limit": limit
+        }
+
+        if len(columns) > 0:
+            params["columns"] = ",".join(sorted(set(columns)))
+
+        url = f'{self.base_url}/{index}'
+        result = await self._request("index_list", url, params=params, raw=raw, priority=priority)
+        return self._parse(SearchPage, result, raw)
+
+    def iter_index_list(self, index, columns=(), page=1, limit=3000, language="en", prefetch=2, priority=None):
+        """
+        Iterate over every row of a given index, fetching pages lazily.
+        Takes the same parameters as index_list, page being the first page to fetch and limit defaulting to 3000, plus:
+        Optional[prefetch: int]
+            The number of pages fetched ahead of the one being consumed. Defaults to 2.
+        """
+        return self._paginate(lambda p: self.index_list(index, columns, p, limit, language, priority=priority), page, prefetch)
+
+    async def lore_search(self, query, language="en", raw=False, priority=None):
         """|coro|
         Search cutscene subtitles, quest dialog, item, achievement, mount & minion descriptions and more for any text that matches query.
         Parameters
@@ -380,6 +940,10 @@ class XIVAPIClient:
         Optional[language: str]
             The two character length language code that indicates the language to return the response in. Defaults to English (en).
             Valid values are "en", "fr", "de" & "ja"
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
         """
         params = {
             "private_key": self.api_key,
@@ -388,35 +952,374 @@ class XIVAPIClient:
         }
 
         url = f'{self.base_url}/lore'
-        async with self.session.get(url, params=params) as response:
-            return await self.process_response(response)
+        return await self._request("lore_search", url, params=params, raw=raw, priority=priority)
+
+    async def lore_search_localized(self, query, languages=None, priority=None):
+        """|coro|
+        Run lore_search in several languages concurrently, returning the results keyed by language code.
+        XIVAPI has no suffixed columns for lore, so this sends one request per language, sharing cache entries with
+        single language calls.
+        Parameters
+        ------------
+        query: str
+            The text to search game content for.
+        Optional[languages: list]
+            The language codes to search in. Defaults to every language.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
+        """
+        languages = list(languages) if languages is not None else self.languages
+        for language in languages:
+            if language not in self.languages:
+                raise XIVAPIInvalidLanguage(f'"{language}" is not a valid language code for XIVAPI.')
 
-    @timed
-    async def lodestone_worldstatus(self):
+        results = await asyncio.gather(*(self.lore_search(query, language, priority=priority) for language in languages))
+        return dict(zip(languages, results))
+
+    async def lodestone_worldstatus(self, raw=False, priority=None):
         """|coro|
         Request world status post from the Lodestone.
+        Parameters
+        ------------
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
+        """
+        params = {
+            "private_key": self.api_key
+        }
+
+        url = f'{self.base_url}/lodestone/worldstatus'
+        return await self._request("lodestone_worldstatus", url, params=params, raw=raw, priority=priority)
+
+    async def patch_list(self, raw=False, priority=None):
+        """|coro|
+        Request the list of game patches, the latest last.
+        Parameters
+        ------------
+        Optional[raw: bool]
+            Return the undecoded response body instead of parsing it. Defaults to False.
+        Optional[priority: str]
+            The priority class of the request when the client has a scheduler, e.g. "interactive". Defaults to "normal".
         """
-        url = f'{self.base_url}/lodestone/worldstatus?private_key={self.api_key}'
-        async with self.session.get(url) as response:
-            return await self.process_response(response)
+        params = {
+            "private_key": self.api_key
+        }
+
+        url = f'{self.base_url}/patchlist'
+        return await self._request("patch_list", url, params=params, raw=raw, priority=priority)
+
+    async def _paginate(self, fetch, page: int, prefetch: int):
+        """
+        Yield the Results of every page from page onwards, fetching up to prefetch pages ahead while the current
+        one is consumed. Stops after the last page given by Pagination, or when a page has no next page.
+        """
+        results, pagination = _page(await fetch(page))
+        page_total = pagination.get("PageTotal")
+
+        pending = deque()
+        next_page = page + 1
+        try:
+            while True:
+                if page_total is not None:
+                    while len(pending) < prefetch and next_page <= page_total:
+                        pending.append(asyncio.ensure_future(fetch(next_page)))
+                        next_page += 1
+
+                for row in results:
+                    yield row
+
+                if pending:
+                    results, pagination = _page(await pending.popleft())
+                    continue
+
+                if page_total is not None and next_page <= page_total:
+                    # Nothing fetched ahead, e.g. with prefetch=0.
+                    results, pagination = _page(await fetch(next_page))
+                    next_page += 1
+                    continue
+
+                page_next = pagination.get("PageNext")
+                if page_total is not None or not page_next or not results:
+                    break
+                results, pagination = _page(await fetch(page_next))
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _parse(self, model, result, raw: bool, *args):
+        """Wrap a decoded response in model when models are enabled."""
+        if raw or not self.models or result is None:
+            return result
+        return model(result, *args)
+
+    async def _cached(self, endpoint: str, url: str, params: Optional[dict] = None):
+        """|coro|
+        The decoded response to a GET request when the cache holds a fresh copy of it, None otherwise. Nothing is sent.
+        """
+        if self.cache is None or self.cache.ttl_for(endpoint) <= 0:
+            return None
+        entry = await self.cache.backend.get(_Call(endpoint, "GET", url, params, None, False).identity())
+        return entry.value if entry is not None and entry.fresh else None
+
+    async def _request(self, endpoint: str, url: str, params: Optional[dict] = None, method: str = "GET", json: Union[dict, bytes, None] = None, raw: bool = False, priority: Optional[str] = None):
+        """|coro|
+        Send a request on behalf of endpoint, serving it from the cache when a fresh copy is held.
+        json is a body to encode, or a body already encoded as JSON.
+        A stale copy is revalidated with a conditional request and served again if XIVAPI answers 304 Not Modified,
+        or served at once and refreshed in the background within the cache's stale windows. Identical concurrent requests share a single HTTP request when coalescing is enabled.
+        """
+        call = _Call(endpoint, method, url, params, json, raw, priority)
+        if self.instrumentation is None:
+            return await self._call(call)
+
+        event = call.event = CallEvent(endpoint, method, url)
+        started = perf_counter()
+        try:
+            return await self._call(call)
+        except BaseException as e:
+            event.error = e
+            raise
+        finally:
+            event.total = perf_counter() - started
+            self.instrumentation.emit(event)
+
+    async def _call(self, call: "_Call"):
+        event = call.event
+
+        if self.cache is not None and self.cache.ttl_for(call.endpoint) > 0:
+            call.key = call.identity()
+            call.entry = await self.cache.get(call.key)
+            if event is not None:
+                event.cache = "hit" if call.entry is not None and call.entry.fresh else "miss"
+            if call.entry is not None and call.entry.fresh:
+                return call.entry.value
+            if call.entry is not None and self.cache.serves_stale(call.entry):
+                if event is not None:
+                    event.cache = "stale"
+                self._refresh(call)
+                return call.entry.value
+
+        try:
+            return await self._shared(call)
+        except Exception as e:
+            # A stale copy beats an outage, but not a response saying the request itself is wrong.
+            if call.entry is None or (isinstance(e, XIVAPIResponseError) and e.status is not None and 400 <= e.status < 500 and e.status != 429):
+                raise
+            if not self.cache.serves_stale(call.entry, error=True):
+                raise
+            __log__.warning(f'Serving a stale {call.endpoint} response after {e!r}')
+            if event is not None:
+                event.cache = "stale"
+            return call.entry.value
+
+    async def _shared(self, call: "_Call"):
+        """|coro|
+        Fetch a response, sharing the request with identical concurrent calls when coalescing is enabled.
+        With a scheduler, only calls of the same priority class share a request.
+        """
+        event = call.event
+        if not self.coalesce:
+            return await self._fetch(call)
+
+        flight_key = call.key if call.key is not None else call.identity()
+        if self.scheduler is not None:
+            # The shared request waits in the queue of the call starting it, so only calls of the same priority
+            # class share it, e.g. an interactive call never waits behind the bulk queue.
+            flight_key = f'{flight_key} #{call.priority or DEFAULT_PRIORITY}'
+        task = self._in_flight.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(call))
+            self._in_flight[flight_key] = task
+            task.add_done_callback(lambda t: self._landed(flight_key, t))
+        else:
+            self.coalesced += 1
+            if event is not None:
+                event.coalesced = True
+
+        # Shielded so that a cancelled caller does not cancel the request for the others sharing it.
+        return await asyncio.shield(task)
+
+    def _landed(self, flight_key: str, task: asyncio.Future) -> None:
+        self._in_flight.pop(flight_key, None)
+        if not task.cancelled():
+            # Retrieve the exception so that it is not reported as unhandled when every caller was cancelled.
+            task.exception()
+
+    def _refresh(self, call: "_Call") -> None:
+        """Fetch a fresh copy of a stale response in the background, once however many calls served it."""
+        if call.key in self._refreshing:
+            return
+
+        refresh = _Call(call.endpoint, call.method, call.url, call.params, call.json, call.raw, call.priority)
+        refresh.key = call.key
+        refresh.entry = call.entry
+        task = asyncio.ensure_future(self._fetch(refresh))
+        self._refreshing[call.key] = task
+        task.add_done_callback(lambda t: self._refreshed(call.key, t))
 
-    async def process_response(self, response):
+    def _refreshed(self, key: str, task: asyncio.Future) -> None:
+        self._refreshing.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            __log__.warning(f'Background refresh failed: {task.exception()!r}')
+
+    async def _fetch(self, call: "_Call"):
+        """|coro|
+        Send a request, retrying it according to the retry policy.
+        """
+        if self.retry_policy is not None:
+            return await self.retry_policy.call(self._attempt, call)
+
+        return await self._attempt(call)
+
+    async def _attempt(self, call: "_Call"):
+        """|coro|
+        Make one attempt at a request, unless the circuit of its endpoint is open.
+        """
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return await self._scheduled(call)
+
+        family = breaker.family(call.endpoint)
+        trial = breaker.before(family)
+        try:
+            result = await self._scheduled(call)
+        except BaseException as e:
+            breaker.record(family, e, trial)
+            raise
+        breaker.record(family, trial=trial)
+        return result
+
+    async def _scheduled(self, call: "_Call"):
+        """|coro|
+        Send a request, waiting for a scheduler slot first.
+        """
+        if call.event is not None:
+            call.event.attempts += 1
+
+        if self.scheduler is not None:
+            queued = perf_counter()
+            async with self.scheduler.slot(call.priority):
+                if call.event is not None:
+                    call.event.queue_wait += perf_counter() - queued
+                return await self._throttled(call)
+
+        return await self._throttled(call)
+
+    async def _throttled(self, call: "_Call"):
+        """|coro|
+        Send a request once the rate limiter lets it through.
+        """
+        if self.rate_limiter is not None:
+            queued = perf_counter()
+            async with self.rate_limiter:
+                if call.event is not None:
+                    call.event.queue_wait += perf_counter() - queued
+                return await self._send_with_key(call)
+
+        return await self._send_with_key(call)
+
+    async def _send_with_key(self, call: "_Call"):
+        """|coro|
+        Send a request with a key from the key pool, if any. A request refused with 401 or 429 is sent again with
+        another key while there are keys left to try.
+        """
+        if self.key_pool is None:
+            return await self._send(call)
+
+        tried = 0
+        while True:
+            queued = perf_counter()
+            key = await self.key_pool.acquire()
+            if call.event is not None:
+                call.event.queue_wait += perf_counter() - queued
+
+            call.params = dict(call.params or {}, private_key=key.key)
+            tried += 1
+            try:
+                result = await self._send(call)
+            except XIVAPIResponseError as e:
+                self.key_pool.release(key, e.status, e.retry_after)
+                if e.status in (401, 429) and tried < len(self.key_pool) and self.key_pool.available:
+                    continue
+                raise
+            except BaseException:
+                self.key_pool.release(key)
+                raise
+
+            self.key_pool.release(key, 200)
+            return result
+
+    async def _send(self, call: "_Call"):
+        """|coro|
+        Send a single HTTP request and store its response in the cache.
+        """
+        entry = call.entry
+        event = call.event
+        headers = entry.conditional_headers() if entry is not None else None
+        phases = Phases() if event is not None else None
+        if isinstance(call.json, bytes):
+            # Bodies serialized ahead of time, e.g. by SearchQuery, are sent as they are.
+            body = {"data": call.json}
+            headers = dict(headers or {}, **{"Content-Type": "application/json"})
+        else:
+            body = {"json": call.json}
+
+        async with self.session.request(call.method, call.url, params=call.params, headers=headers, trace_request_ctx=phases, **body) as response:
+            if event is not None:
+                event.status = response.status
+                event.dns = phases.dns
+                event.connect = phases.connect
+                event.ttfb = phases.ttfb
+
+            if response.status == 304 and entry is not None:
+                __log__.info(f'{response.status} from {response.url}')
+                await self.cache.revalidated(call.key, call.endpoint, entry, response.headers)
+                if event is not None:
+                    event.cache = "revalidated"
+                return entry.value
+
+            body = await response.read() if response.status == 200 else None
+
+            decode_started = perf_counter()
+            result = await self.process_response(response, raw=call.raw)
+
+            if body is not None:
+                if event is not None:
+                    event.response_bytes = len(body)
+                    event.decode_time = perf_counter() - decode_started
+                if call.key is not None:
+                    await self.cache.set(call.key, call.endpoint, result, size=len(body), headers=response.headers)
+
+            return result
+
+    async def process_response(self, response, raw: bool = False):
         __log__.info(f'{response.status} from {response.url}')
 
         if response.status == 200:
-            return await response.json()
+            body = await response.read()
+            return body if raw else self.decoder(body)
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
 
         if response.status == 400:
-            raise XIVAPIBadRequest("Request was bad. Please check your parameters.")
+            raise XIVAPIBadRequest("Request was bad. Please check your parameters.", response.status)
 
         if response.status == 401:
-            raise XIVAPIForbidden("Request was refused. Possibly due to an invalid API key.")
+            raise XIVAPIForbidden("Request was refused. Possibly due to an invalid API key.", response.status)
 
         if response.status == 404:
-            raise XIVAPINotFound("Resource not found.")
+            raise XIVAPINotFound("Resource not found.", response.status)
+
+        if response.status == 429:
+            raise XIVAPITooManyRequests("Too many requests. Please slow down.", response.status, retry_after)
 
         if response.status == 500:
-            raise XIVAPIError("An internal server error has occured on XIVAPI.")
+            raise XIVAPIError("An internal server error has occured on XIVAPI.", response.status, retry_after)
 
         if response.status == 503:
-            raise XIVAPIServiceUnavailable("Service is unavailable. This could be because the Lodestone is under maintenance.")
+            raise XIVAPIServiceUnavailable("Service is unavailable. This could be because the Lodestone is under maintenance.", response.status, retry_after)
+
+        if response.status >= 400:
+            raise XIVAPIError(f'Unexpected {response.status} response from XIVAPI.', response.status, retry_after)
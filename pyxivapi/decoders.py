@@ -0,0 +1,37 @@
+import json
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_decoder(body: bytes) -> Any:
+    """Decode a response body with the standard library's json module."""
+    return json.loads(body)
+
+
+def orjson_decoder(body: bytes) -> Any:
+    """Decode a response body with orjson."""
+    return orjson.loads(body)
+
+
+def default_decoder() -> Callable[[bytes], Any]:
+    """Return the fastest decoder available: orjson when it is installed, json otherwise."""
+    return orjson_decoder if orjson is not None else json_decoder
+
+
+def json_encoder(value: Any) -> bytes:
+    """Encode a value as compact JSON with the standard library's json module."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def orjson_encoder(value: Any) -> bytes:
+    """Encode a value as JSON with orjson."""
+    return orjson.dumps(value)
+
+
+def default_encoder() -> Callable[[Any], bytes]:
+    """Return the fastest encoder available: orjson when it is installed, json otherwise."""
+    return orjson_encoder if orjson is not None else json_encoder
@@ -6,7 +6,10 @@ __log__ = logging.getLogger(__name__)
 
 
 def timed(func):
-    """This decorator prints the execution time for the decorated function."""
+    """
+    This decorator prints the execution time for the decorated function.
+    XIVAPIClient no longer uses it and reports its timings through pyxivapi.instrumentation instead.
+    """
     @wraps(func)
     async def wrapper(*args, **kwargs):
         start = time()
@@ -1,31 +1,56 @@
-class XIVAPIForbidden(Exception):
+class XIVAPIResponseError(Exception):
+    """
+    Base class for errors returned by XIVAPI
+    """
+    def __init__(self, message: str = "", status: int = None, retry_after: float = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class XIVAPIForbidden(XIVAPIResponseError):
     """
     XIVAPI Forbidden Request error
     """
     pass
 
 
-class XIVAPIBadRequest(Exception):
+class XIVAPIBadRequest(XIVAPIResponseError):
     """
     XIVAPI Bad Request error
     """
     pass
 
 
-class XIVAPINotFound(Exception):
+class XIVAPINotFound(XIVAPIResponseError):
     """
     XIVAPI not found error
     """
     pass
 
 
-class XIVAPIServiceUnavailable(Exception):
+class XIVAPIServiceUnavailable(XIVAPIResponseError):
     """
     XIVAPI service unavailable error
     """
     pass
 
 
+class XIVAPITooManyRequests(XIVAPIResponseError):
+    """
+    XIVAPI rate limit exceeded error
+    """
+    pass
+
+
+class XIVAPICircuitOpen(XIVAPIServiceUnavailable):
+    """
+    Raised without sending a request while the circuit of an endpoint family is open after repeated failures.
+    retry_after is the number of seconds before a trial request is let through.
+    """
+    pass
+
+
 class XIVAPIInvalidLanguage(Exception):
     """
     XIVAPI invalid language error
@@ -68,7 +93,7 @@ class XIVAPIInvalidDatacenter(Exception):
     pass
 
 
-class XIVAPIError(Exception):
+class XIVAPIError(XIVAPIResponseError):
     """
     XIVAPI error
     """
@@ -0,0 +1,334 @@
+import asyncio
+import csv
+import glob
+import json
+import logging
+import os
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .decoders import default_encoder
+from .exceptions import XIVAPIInvalidColumns, XIVAPIInvalidIndex
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+__log__ = logging.getLogger(__name__)
+
+FORMATS = ("ndjson", "csv", "parquet")
+
+
+def _flatten(row: dict, columns: List[str]) -> List:
+    """The value of each dotted column of a row, nested objects and lists encoded as JSON."""
+    values = []
+    for column in columns:
+        value = row
+        for key in column.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+        values.append(value)
+    return values
+
+
+class NDJSONWriter:
+    """
+    Writes rows as they come, one JSON object per line.
+    """
+
+    def __init__(self, path: str, columns: List[str]):
+        self.path = path
+        self.columns = columns
+        self.encoder = default_encoder()
+        self._file = None
+
+    def open(self, state: Optional[dict]) -> None:
+        if state is None:
+            self._file = open(self.path, "wb")
+        else:
+            # Drop whatever was written after the last checkpoint.
+            self._file = open(self.path, "r+b")
+            self._file.truncate(state["size"])
+            self._file.seek(state["size"])
+
+    def write(self, rows: List[dict]) -> None:
+        encode = self.encoder
+        self._file.write(b"".join(encode(row) + b"\n" for row in rows))
+
+    def commit(self, final: bool = False) -> Optional[dict]:
+        self._file.flush()
+        return {"size": self._file.tell()}
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+class CSVWriter:
+    """
+    Writes rows as they come, one column per requested column. Nested objects and lists are written as JSON.
+    """
+
+    def __init__(self, path: str, columns: List[str]):
+        self.path = path
+        self.columns = columns
+        self._file = None
+        self._writer = None
+
+    def open(self, state: Optional[dict]) -> None:
+        if state is None:
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.columns)
+        else:
+            with open(self.path, "r+b") as file:
+                file.truncate(state["size"])
+            self._file = open(self.path, "a", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+
+    def write(self, rows: List[dict]) -> None:
+        self._writer.writerows(_flatten(row, self.columns) for row in rows)
+
+    def commit(self, final: bool = False) -> Optional[dict]:
+        self._file.flush()
+        return {"size": os.fstat(self._file.fileno()).st_size}
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+class ParquetWriter:
+    """
+    Writes rows to a directory of Parquet files of about rows_per_file rows each, since a Parquet file can't be
+    appended to once closed. Read them back with pyarrow.dataset.dataset(path). Requires pyarrow.
+    Every file has the same schema: the type of a column comes from its first non-null values, widened when later
+    values need it, e.g. from int64 to double, and files written before are rewritten to it when the export ends.
+    """
+
+    def __init__(self, path: str, columns: List[str], rows_per_file: int = 100000):
+        if pyarrow is None:
+            raise ImportError("Parquet exports require pyarrow, install it with pip install pyxivapi[parquet]")
+
+        self.path = path
+        self.columns = columns
+        self.rows_per_file = rows_per_file
+        self.parts = 0
+        self.schema = None
+        self._buffer: List[List] = []
+
+    def _part(self, number: int) -> str:
+        return os.path.join(self.path, f'part-{number:05d}.parquet')
+
+    def open(self, state: Optional[dict]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        self.parts = state["parts"] if state is not None else 0
+        # Drop the files written after the last checkpoint, or by a previous export.
+        for part in glob.glob(os.path.join(self.path, "part-*.parquet")):
+            if int(os.path.basename(part)[5:10]) >= self.parts:
+                os.remove(part)
+        # Each file is cast to the schema known when it was written, so the last one has the widest.
+        self.schema = pyarrow.parquet.read_schema(self._part(self.parts - 1)) if self.parts else None
+
+    def write(self, rows: List[dict]) -> None:
+        self._buffer.extend(_flatten(row, self.columns) for row in rows)
+
+    def commit(self, final: bool = False) -> Optional[dict]:
+        if len(self._buffer) < self.rows_per_file and not (final and self._buffer):
+            if final:
+                self._conform()
+            return {"parts": self.parts} if final else None
+
+        columns = {column: [row[i] for row in self._buffer] for i, column in enumerate(self.columns)}
+        table = pyarrow.table(columns)
+        if self.schema is None:
+            self.schema = table.schema
+        else:
+            self.schema = pyarrow.unify_schemas([self.schema, table.schema], promote_options="permissive")
+        pyarrow.parquet.write_table(table.cast(self.schema), self._part(self.parts))
+        self.parts += 1
+        self._buffer = []
+        if final:
+            self._conform()
+        return {"parts": self.parts}
+
+    def _conform(self) -> None:
+        """Rewrite the files written before a column's type was known or widened to the final schema."""
+        for number in range(self.parts):
+            part = self._part(number)
+            if not pyarrow.parquet.read_schema(part).equals(self.schema):
+                temporary = part + ".tmp"
+                pyarrow.parquet.write_table(pyarrow.parquet.read_table(part).cast(self.schema), temporary)
+                os.replace(temporary, part)
+
+    def close(self) -> None:
+        self._buffer = []
+
+
+WRITERS = {
+    "ndjson": NDJSONWriter,
+    "csv": CSVWriter,
+    "parquet": ParquetWriter,
+}
+
+
+class IndexExport:
+    """
+    Streams every row of an index to a file, fetching pages concurrently and decoding them one at a time, so memory
+    stays bounded by the pages in flight whatever the size of the index.
+    Progress is saved to a checkpoint file after every page written (every file for Parquet), and a later export
+    with the same parameters continues from the last written page instead of starting over. The checkpoint is
+    removed once the export completes.
+    Parameters
+    ------------
+    client: XIVAPIClient
+        The client used to download the index.
+    index: str
+        The index to export, e.g. "Item".
+    columns: list
+        The columns to export. ID is always exported.
+    path: str
+        The file to write, or the directory of Parquet files.
+    Optional[format: str]
+        "ndjson", "csv" or "parquet". Defaults to the extension of path.
+    Optional[language: str]
+        The language of the exported data. Defaults to English (en).
+    Optional[page_size: int]
+        The number of rows per request, up to 3000. Defaults to 3000.
+    Optional[concurrency: int]
+        The number of pages downloaded at once. Defaults to 4.
+    Optional[rows_per_file: int]
+        The number of rows per Parquet file, Parquet exports being checkpointed once per file. Defaults to 100000.
+    Optional[checkpoint: str]
+        The checkpoint file. Defaults to path with a .checkpoint suffix.
+    Optional[progress: Callable[[int, int, int], None]]
+        Called after every page written with the page, the number of pages and the number of rows written.
+    """
+
+    def __init__(self, client, index: str, columns: Iterable[str], path: str, format: Optional[str] = None, language: str = "en", page_size: int = 3000, concurrency: int = 4, rows_per_file: int = 100000, checkpoint: Optional[str] = None, progress: Optional[Callable[[int, int, int], None]] = None):
+        if index == "":
+            raise XIVAPIInvalidIndex("Please specify an index to export, e.g. \"Item\"")
+
+        columns = list(dict.fromkeys(["ID", *columns]))
+        if len(columns) == 1:
+            raise XIVAPIInvalidColumns("Please specify at least one column to export.")
+
+        format = format or os.path.splitext(path)[1].lstrip(".").lower()
+        if format == "jsonl":
+            format = "ndjson"
+        if format not in FORMATS:
+            raise ValueError(f'"{format}" is not a supported export format, use one of: {", ".join(FORMATS)}')
+
+        self.client = client
+        self.index = index
+        self.columns = columns
+        self.path = path
+        self.format = format
+        self.language = language
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.rows_per_file = rows_per_file
+        self.checkpoint = checkpoint or path.rstrip("/\\") + ".checkpoint"
+        self.progress = progress
+
+        self.rows = 0
+        self.pages = 0
+        self.resumed_from: Optional[int] = None
+
+    def _identity(self) -> dict:
+        return {
+            "index": self.index,
+            "columns": self.columns,
+            "format": self.format,
+            "language": self.language,
+            "page_size": self.page_size,
+        }
+
+    def _load_checkpoint(self) -> Optional[dict]:
+        try:
+            with open(self.checkpoint, encoding="utf-8") as file:
+                saved = json.load(file)
+        except FileNotFoundError:
+            return None
+
+        if saved.get("export") != self._identity() or not os.path.exists(self.path):
+            __log__.warning(f'Ignoring checkpoint {self.checkpoint} of another export')
+            return None
+        return saved
+
+    def _save_checkpoint(self, page: int, state: dict) -> None:
+        saved = {"export": self._identity(), "page": page, "rows": self.rows, "writer": state}
+        temporary = self.checkpoint + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(saved, file)
+        os.replace(temporary, self.checkpoint)
+
+    async def _fetch(self, page: int) -> dict:
+        body = await self.client.index_list(self.index, self.columns, page, self.page_size, self.language, raw=True)
+        return self.client.decoder(body)
+
+    async def run(self) -> Dict[str, int]:
+        """|coro|
+        Run the export, resuming from the checkpoint if there is one.
+        Returns the number of pages and rows written by this run, and the page it resumed after.
+        """
+        saved = self._load_checkpoint()
+        options = {"rows_per_file": self.rows_per_file} if self.format == "parquet" else {}
+        writer = WRITERS[self.format](self.path, self.columns, **options)
+        writer.open(saved["writer"] if saved is not None else None)
+
+        start = 1
+        self.rows = 0
+        self.pages = 0
+        if saved is not None:
+            start = saved["page"] + 1
+            self.rows = saved["rows"]
+            self.resumed_from = saved["page"]
+            __log__.info(f'Resuming export of {self.index} after page {saved["page"]}')
+
+        written = self.rows
+        pending = deque()
+        try:
+            response = await self._fetch(start)
+            page_total = (response.get("Pagination") or {}).get("PageTotal") or start
+
+            page = start
+            next_page = start + 1
+            while True:
+                while len(pending) < self.concurrency and next_page <= page_total:
+                    pending.append(asyncio.ensure_future(self._fetch(next_page)))
+                    next_page += 1
+
+                results = response.get("Results") or []
+                writer.write(results)
+                self.rows += len(results)
+                self.pages += 1
+                response = None
+
+                state = writer.commit(final=page >= page_total)
+                if state is not None:
+                    self._save_checkpoint(page, state)
+
+                if self.progress is not None:
+                    self.progress(page, page_total, self.rows)
+
+                if pending:
+                    response = await pending.popleft()
+                elif next_page <= page_total:
+                    # Nothing fetched ahead, e.g. with concurrency=0.
+                    response = await self._fetch(next_page)
+                    next_page += 1
+                else:
+                    break
+                page += 1
+        finally:
+            for task in pending:
+                task.cancel()
+            writer.close()
+
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        return {"pages": self.pages, "rows": self.rows - written, "resumed_from": self.resumed_from}
@@ -0,0 +1,284 @@
+import logging
+import math
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional
+
+from aiohttp import TraceConfig
+
+__log__ = logging.getLogger(__name__)
+
+
+class Phases:
+    """
+    Timings in seconds of the phases of one HTTP request, recorded through an aiohttp TraceConfig.
+    A phase which did not happen, e.g. a DNS lookup served from the cache, is left as None.
+    """
+
+    __slots__ = ("started", "dns", "connect", "ttfb", "_dns_started", "_connect_started")
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.dns: Optional[float] = None
+        self.connect: Optional[float] = None
+        self.ttfb: Optional[float] = None
+        self._dns_started = None
+        self._connect_started = None
+
+
+class CallEvent:
+    """
+    Event emitted once per call to an endpoint of XIVAPIClient.
+    Attributes
+    ------------
+    endpoint: str
+        The name of the XIVAPIClient method.
+    method: str
+        The HTTP method.
+    url: str
+        The requested URL, without its query string.
+    status: Optional[int]
+        The status of the last response, None if no response was received.
+    attempts: int
+        The number of HTTP requests sent, 0 for a call served from the cache or coalesced with another.
+    queue_wait: float
+        The seconds spent waiting for a scheduler slot, the rate limiter and a pooled key.
+    dns: Optional[float]
+        The seconds spent resolving XIVAPI's host name for the last attempt.
+    connect: Optional[float]
+        The seconds spent opening a connection for the last attempt, DNS resolution included.
+    ttfb: Optional[float]
+        The seconds between sending the last attempt and receiving its response headers.
+    total: float
+        The seconds the whole call took.
+    response_bytes: Optional[int]
+        The size of the last response body.
+    decode_time: Optional[float]
+        The seconds spent decoding the last response body.
+    cache: Optional[str]
+        "hit", "miss", "revalidated" or "stale" when the response cache was consulted.
+    coalesced: bool
+        Whether the call shared the request of an identical call.
+    error: Optional[BaseException]
+        The exception raised by the call, if any.
+    """
+
+    __slots__ = (
+        "endpoint", "method", "url", "status", "attempts", "queue_wait", "dns", "connect", "ttfb", "total",
+        "response_bytes", "decode_time", "cache", "coalesced", "error"
+    )
+
+    def __init__(self, endpoint: str, method: str, url: str):
+        self.endpoint = endpoint
+        self.method = method
+        self.url = url
+        self.status: Optional[int] = None
+        self.attempts = 0
+        self.queue_wait = 0.0
+        self.dns: Optional[float] = None
+        self.connect: Optional[float] = None
+        self.ttfb: Optional[float] = None
+        self.total = 0.0
+        self.response_bytes: Optional[int] = None
+        self.decode_time: Optional[float] = None
+        self.cache: Optional[str] = None
+        self.coalesced = False
+        self.error: Optional[BaseException] = None
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f'CallEvent(endpoint={self.endpoint!r}, status={self.status!r}, total={self.total:.4f})'
+
+
+class Histogram:
+    """
+    Latency histogram with logarithmic buckets, recording values in constant time and memory.
+    Percentiles are accurate to within the relative width of a bucket, about 9% by default.
+    Parameters
+    ------------
+    buckets_per_octave: int
+        The number of buckets each time the value doubles. Defaults to 8.
+    """
+
+    __slots__ = ("buckets_per_octave", "counts", "count", "sum", "min", "max")
+
+    # Values below a microsecond all land in the first bucket.
+    floor = 1e-6
+
+    def __init__(self, buckets_per_octave: int = 8):
+        self.buckets_per_octave = buckets_per_octave
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        bucket = int(math.log2(max(value, self.floor) / self.floor) * self.buckets_per_octave)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The value below which q percent of the recorded values fall, None when nothing was recorded."""
+        if self.count == 0:
+            return None
+
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                # Report the middle of the bucket, clamped to the values actually seen.
+                value = self.floor * 2 ** ((bucket + 0.5) / self.buckets_per_octave)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+
+class HistogramSink:
+    """
+    Built-in event sink keeping a latency histogram, a status count and a cache count per endpoint.
+    """
+
+    def __init__(self, buckets_per_octave: int = 8):
+        self.buckets_per_octave = buckets_per_octave
+        self.latencies: Dict[str, Histogram] = {}
+        self.statuses: Dict[str, Dict[Optional[int], int]] = {}
+        self.cache: Dict[str, Dict[Optional[str], int]] = {}
+
+    def __call__(self, event: CallEvent) -> None:
+        histogram = self.latencies.get(event.endpoint)
+        if histogram is None:
+            histogram = self.latencies[event.endpoint] = Histogram(self.buckets_per_octave)
+        histogram.record(event.total)
+
+        statuses = self.statuses.setdefault(event.endpoint, {})
+        statuses[event.status] = statuses.get(event.status, 0) + 1
+
+        cache = self.cache.setdefault(event.endpoint, {})
+        cache[event.cache] = cache.get(event.cache, 0) + 1
+
+    def percentile(self, endpoint: str, q: float) -> Optional[float]:
+        histogram = self.latencies.get(endpoint)
+        return histogram.percentile(q) if histogram is not None else None
+
+    def summary(self) -> Dict[str, dict]:
+        """Call count, mean, p50, p90, p99 and max latency in seconds per endpoint."""
+        return {
+            endpoint: {
+                "count": histogram.count,
+                "mean": histogram.mean,
+                "p50": histogram.percentile(50),
+                "p90": histogram.percentile(90),
+                "p99": histogram.percentile(99),
+                "max": histogram.max,
+            } for endpoint, histogram in self.latencies.items()
+        }
+
+
+class LoggingSink:
+    """
+    Event sink logging one line per call, in place of the former @timed decorator.
+    """
+
+    def __init__(self, logger: logging.Logger = __log__, level: int = logging.INFO):
+        self.logger = logger
+        self.level = level
+
+    def __call__(self, event: CallEvent) -> None:
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, f'{event.endpoint} {event.status} in {event.total * 1000:.1f}ms '
+                                        f'({event.attempts} attempt(s), cache {event.cache})')
+
+
+class Instrumentation:
+    """
+    Collects a CallEvent for every call made by XIVAPIClient and hands it to each sink.
+    A sink is any callable taking a CallEvent, e.g. to export to Prometheus or OpenTelemetry.
+    The DNS, connect and time-to-first-byte phases are only recorded on sessions created by the client, or on a
+    session given to it which was created with trace_configs=[instrumentation.trace_config()].
+    Parameters
+    ------------
+    sinks: Optional[Iterable[Callable[[CallEvent], None]]]
+        The sinks to emit events to. Defaults to a single HistogramSink.
+    """
+
+    def __init__(self, sinks: Optional[Iterable[Callable[[CallEvent], None]]] = None):
+        self.sinks: List[Callable[[CallEvent], None]] = list(sinks) if sinks is not None else [HistogramSink()]
+
+    @property
+    def histogram(self) -> Optional[HistogramSink]:
+        """The first HistogramSink among the sinks, if any."""
+        return next((sink for sink in self.sinks if isinstance(sink, HistogramSink)), None)
+
+    def add_sink(self, sink: Callable[[CallEvent], None]) -> None:
+        self.sinks.append(sink)
+
+    def emit(self, event: CallEvent) -> None:
+        for sink in self.sinks:
+            try:
+                sink(event)
+            except Exception:
+                __log__.exception(f'Instrumentation sink {sink!r} failed')
+
+    def trace_config(self) -> TraceConfig:
+        """
+        A TraceConfig recording the phases of requests sent with a Phases instance as trace_request_ctx.
+        """
+        config = TraceConfig()
+        config.on_dns_resolvehost_start.append(_dns_start)
+        config.on_dns_resolvehost_end.append(_dns_end)
+        config.on_connection_create_start.append(_connect_start)
+        config.on_connection_create_end.append(_connect_end)
+        config.on_request_end.append(_request_end)
+        return config
+
+    @staticmethod
+    def traces(session) -> bool:
+        """Whether session was created with a trace config recording the phases of requests."""
+        configs = getattr(session, "trace_configs", None)
+        if configs is None:
+            configs = getattr(session, "_trace_configs", ())
+        return any(_request_end in config.on_request_end for config in configs)
+
+
+def _phases(context) -> Optional[Phases]:
+    phases = context.trace_request_ctx
+    return phases if isinstance(phases, Phases) else None
+
+
+async def _dns_start(session, context, params):
+    phases = _phases(context)
+    if phases is not None:
+        phases._dns_started = perf_counter()
+
+
+async def _dns_end(session, context, params):
+    phases = _phases(context)
+    if phases is not None and phases._dns_started is not None:
+        phases.dns = perf_counter() - phases._dns_started
+
+
+async def _connect_start(session, context, params):
+    phases = _phases(context)
+    if phases is not None:
+        phases._connect_started = perf_counter()
+
+
+async def _connect_end(session, context, params):
+    phases = _phases(context)
+    if phases is not None and phases._connect_started is not None:
+        phases.connect = perf_counter() - phases._connect_started
+
+
+async def _request_end(session, context, params):
+    phases = _phases(context)
+    if phases is not None:
+        phases.ttfb = perf_counter() - phases.started
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+from time import monotonic
+from typing import Dict, Iterable, List, Optional
+
+from .exceptions import XIVAPIForbidden, XIVAPITooManyRequests
+from .ratelimit import RateLimiter
+
+__log__ = logging.getLogger(__name__)
+
+
+class APIKey:
+    """
+    A key of a KeyPool, with its rate limiter, quarantine and usage counters.
+    Attributes
+    ------------
+    name: str
+        The key with all but its first and last four characters masked, safe to log.
+    requests: int
+        The number of requests sent with the key.
+    throttled: int
+        The number of 429 Too Many Requests responses to the key.
+    rejected: int
+        The number of 401 responses to the key, e.g. once it was revoked.
+    errors: int
+        The number of other failed requests sent with the key.
+    """
+
+    def __init__(self, key: str, limiter: RateLimiter):
+        self.key = key
+        self.name = f'{key[:4]}...{key[-4:]}' if len(key) > 12 else "..."
+        self.limiter = limiter
+
+        self.requests = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.errors = 0
+        self.strikes = 0
+        self.quarantined_until = 0.0
+        # Whether the key is set aside after a 401 rather than a 429.
+        self.refused = False
+
+    @property
+    def quarantined(self) -> bool:
+        return self.quarantined_until > monotonic()
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "quarantined_for": max(0.0, self.quarantined_until - monotonic()),
+            "in_flight": self.limiter.in_flight,
+            "mean_wait": self.limiter.stats["mean_wait"],
+        }
+
+    def __repr__(self):
+        return f'APIKey({self.name!r})'
+
+
+class KeyPool:
+    """
+    Spreads the requests of a client over several API keys, each with its own rate limiter.
+    Each request goes to the key which can send it soonest. A key answered with 429 is set aside for the
+    Retry-After delay, or for quarantine seconds doubling on every consecutive 429, and a key answered with 401 for
+    max_quarantine seconds. Once every key is set aside, a request waits up to max_wait seconds for a throttled key,
+    and fails at once with XIVAPIForbidden when every key was refused with 401.
+    Pass it to XIVAPIClient in place of the API key.
+    Parameters
+    ------------
+    keys: Iterable[str]
+        The API keys.
+    rate: float
+        The sustained number of requests allowed per second and key. Defaults to 20, XIVAPI's per-key limit.
+    burst: Optional[int]
+        The number of requests a key may send at once after a quiet period. Defaults to rate.
+    quarantine: float
+        How long in seconds a key is set aside after a first 429 without Retry-After. Defaults to 1.
+    max_quarantine: float
+        The longest a key is set aside, and how long after a 401. Defaults to an hour.
+    max_wait: float
+        The longest a request waits for a throttled key before failing with XIVAPITooManyRequests. Defaults to 30.
+    """
+
+    def __init__(self, keys: Iterable[str], rate: float = 20, burst: Optional[int] = None, quarantine: float = 1, max_quarantine: float = 3600, max_wait: float = 30):
+        # Keys share their limiter with any other client or pool using them.
+        self.keys: List[APIKey] = [APIKey(key, RateLimiter.shared(key, rate=rate, burst=burst)) for key in dict.fromkeys(keys)]
+        if not self.keys:
+            raise ValueError("KeyPool needs at least one key")
+
+        self.quarantine = quarantine
+        self.max_quarantine = max_quarantine
+        self.max_wait = max_wait
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def available(self) -> int:
+        """The number of keys which aren't quarantined."""
+        return sum(not key.quarantined for key in self.keys)
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Usage counters of every key, keyed by masked key."""
+        return {key.name: key.stats for key in self.keys}
+
+    async def acquire(self, max_wait: Optional[float] = None) -> APIKey:
+        """|coro|
+        Wait for the key which can send a request soonest, skipping quarantined keys.
+        Raises XIVAPIForbidden when every key was refused with 401, and XIVAPITooManyRequests when every key is
+        throttled for longer than max_wait seconds, the pool's max_wait by default.
+        Every acquired key must be given back with release.
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        while True:
+            now = monotonic()
+            keys = [key for key in self.keys if key.quarantined_until <= now]
+            if not keys:
+                # Waiting only helps with throttled keys: a refused key stays refused.
+                throttled = [key for key in self.keys if not key.refused]
+                if not throttled:
+                    raise XIVAPIForbidden("Every API key of the pool was refused. Possibly due to invalid or revoked keys.", 401)
+
+                delay = min(key.quarantined_until for key in throttled) - now
+                if delay > max_wait:
+                    raise XIVAPITooManyRequests(f'Every API key of the pool is throttled for {delay:.1f}s.', 429, delay)
+                __log__.warning(f'Every API key is quarantined, waiting {delay:.1f}s')
+                await asyncio.sleep(delay)
+                continue
+
+            key = min(keys, key=lambda k: (k.limiter.delay(), k.limiter.in_flight))
+            await key.limiter.acquire()
+            if key.quarantined:
+                # Set aside while waiting for its limiter.
+                key.limiter.release()
+                continue
+
+            key.requests += 1
+            return key
+
+    def release(self, key: APIKey, status: Optional[int] = None, retry_after: Optional[float] = None) -> None:
+        """
+        Give back a key with the status of the response to its request, None if there was no response.
+        """
+        key.limiter.release()
+
+        if status == 429:
+            key.throttled += 1
+            key.strikes += 1
+            key.refused = False
+            delay = retry_after if retry_after is not None else self.quarantine * 2 ** (key.strikes - 1)
+            self._quarantine(key, delay)
+        elif status == 401:
+            key.rejected += 1
+            key.refused = True
+            self._quarantine(key, self.max_quarantine)
+        elif status is None or status >= 400:
+            key.errors += 1
+        else:
+            key.strikes = 0
+            key.refused = False
+
+    def _quarantine(self, key: APIKey, delay: float) -> None:
+        delay = min(delay, self.max_quarantine)
+        __log__.warning(f'Quarantining API key {key.name} for {delay:.1f}s')
+        key.quarantined_until = max(key.quarantined_until, monotonic() + delay)
@@ -0,0 +1,348 @@
+import logging
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from .exceptions import XIVAPIInvalidAlgo, XIVAPIInvalidColumns, XIVAPIInvalidIndex, XIVAPIInvalidLanguage
+from .models import Filter, IndexRow, SearchPage, Sort
+
+__log__ = logging.getLogger(__name__)
+
+# Elasticsearch options sent by XIVAPIClient.index_search for every algorithm.
+PREFIX_LENGTH = 1
+MAX_EXPANSIONS = 50
+
+# String algorithms answered locally. The others are passed on to XIVAPI.
+LOCAL_ALGOS = ("term", "prefix", "fuzzy", "match", "match_phrase", "match_phrase_prefix", "wildcard", "wildcard_plus")
+
+_token = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Case fold text and strip its accents, so that e.g. "Épée" matches "epee"."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    return _token.findall(normalize(text))
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def auto_fuzziness(term: str) -> int:
+    """The edit distance allowed by Elasticsearch's "fuzziness": "AUTO" for a term of this length."""
+    if len(term) <= 2:
+        return 0
+    return 1 if len(term) <= 5 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance between a and b, or limit + 1 as soon as it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _wildcard(pattern: str):
+    return re.compile("".join(".*" if c == "*" else "." if c == "?" else re.escape(c) for c in pattern) + r"\Z", re.DOTALL)
+
+
+def _value(row: dict, field: str):
+    for key in field.split("."):
+        if not isinstance(row, dict):
+            return None
+        row = row.get(key)
+    return row
+
+
+class _Index:
+    """
+    Names of one game data index, with the structures needed to match them.
+    """
+
+    def __init__(self, name: str, rows: Iterable[dict], name_columns: Dict[str, str]):
+        self.name = name
+        self.rows: List[dict] = []
+        # Per row, the normalized name and its tokens in every language.
+        self.names: List[List[str]] = []
+        self.joined: List[str] = []
+        self.tokens: List[List[List[str]]] = []
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+
+        for row in rows:
+            if isinstance(row, IndexRow):
+                row = row.to_dict()
+
+            doc = len(self.rows)
+            names = []
+            for column in name_columns.values():
+                if row.get(column):
+                    names.append(normalize(row[column]))
+            if not names and row.get("Name"):
+                names.append(normalize(row["Name"]))
+
+            self.rows.append(row)
+            self.names.append(names)
+            self.joined.append("\n".join(names))
+            self.tokens.append([_token.findall(name) for name in names])
+            for tokens in self.tokens[-1]:
+                for token in tokens:
+                    self.postings[token].add(doc)
+
+        self.vocabulary = sorted(self.postings)
+        self.grams: Dict[str, Set[str]] = defaultdict(set)
+        for token in self.vocabulary:
+            for gram in trigrams(token):
+                self.grams[gram].add(token)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def prefixed(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """Tokens starting with prefix, in alphabetical order."""
+        found = []
+        for token in self.vocabulary[bisect_left(self.vocabulary, prefix):]:
+            if not token.startswith(prefix) or (limit is not None and len(found) >= limit):
+                break
+            found.append(token)
+        return found
+
+    def similar(self, term: str) -> Dict[str, int]:
+        """Tokens within the automatic fuzziness of term, sharing its first PREFIX_LENGTH characters, with their distance."""
+        limit = auto_fuzziness(term)
+        if limit == 0:
+            return {term: 0} if term in self.postings else {}
+
+        # A token within distance d of term shares all but 3 * d of its trigrams.
+        grams = trigrams(term)
+        counts: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for token in self.grams.get(gram, ()):
+                counts[token] += 1
+
+        needed = len(grams) - 3 * limit
+        found = {}
+        for token, count in counts.items():
+            if count < needed or token[:PREFIX_LENGTH] != term[:PREFIX_LENGTH]:
+                continue
+            distance = edit_distance(term, token, limit)
+            if distance <= limit:
+                found[token] = distance
+
+        return dict(sorted(found.items(), key=lambda item: item[1])[:MAX_EXPANSIONS])
+
+    def docs(self, tokens: Iterable[str]) -> Set[int]:
+        found = set()
+        for token in tokens:
+            found |= self.postings.get(token, set())
+        return found
+
+    def match(self, algo: str, query: str) -> Dict[int, float]:
+        """Score every row whose name matches query with algo."""
+        if algo == "term":
+            return dict.fromkeys(self.postings.get(normalize(query), ()), 1.0)
+
+        if algo == "prefix":
+            prefix = normalize(query)
+            scores = dict.fromkeys(self.docs(self.prefixed(prefix)), 1.0)
+            for doc in scores:
+                if any(name.startswith(prefix) for name in self.names[doc]):
+                    scores[doc] = 2.0
+            return scores
+
+        if algo == "fuzzy":
+            scores = {}
+            for token, distance in self.similar(normalize(query)).items():
+                for doc in self.postings[token]:
+                    scores[doc] = max(scores.get(doc, 0.0), 1 / (1 + distance))
+            return scores
+
+        if algo == "match":
+            scores: Dict[int, float] = defaultdict(float)
+            for term in tokenize(query):
+                best: Dict[int, float] = {}
+                for token, distance in self.similar(term).items():
+                    for doc in self.postings[token]:
+                        best[doc] = max(best.get(doc, 0.0), 1 / (1 + distance))
+                for doc, score in best.items():
+                    scores[doc] += score
+            return scores
+
+        if algo in ("match_phrase", "match_phrase_prefix"):
+            terms = tokenize(query)
+            if not terms:
+                return {}
+            last = self.prefixed(terms[-1], MAX_EXPANSIONS) if algo == "match_phrase_prefix" else [terms[-1]]
+            candidates = self.docs(last)
+            for term in terms[:-1]:
+                candidates &= self.postings.get(term, set())
+            return {doc: 1.0 for doc in candidates if self._phrase(doc, terms[:-1], set(last))}
+
+        if algo == "wildcard":
+            query = normalize(query)
+            pattern = _wildcard(query)
+            # Only tokens starting with the literal head of the pattern can match it.
+            head = re.split(r"[*?]", query, maxsplit=1)[0]
+            tokens = self.prefixed(head) if head else self.vocabulary
+            return dict.fromkeys(self.docs(token for token in tokens if pattern.match(token)), 1.0)
+
+        if algo == "wildcard_plus":
+            query = normalize(query)
+            if "*" not in query and "?" not in query:
+                return {doc: 1.0 for doc, names in enumerate(self.joined) if query in names}
+            pattern = _wildcard(f'*{query}*')
+            return {doc: 1.0 for doc, names in enumerate(self.names) if any(pattern.match(name) for name in names)}
+
+        raise XIVAPIInvalidAlgo(f'"{algo}" is not supported by the local search')
+
+    def _phrase(self, doc: int, head: Sequence[str], last: Set[str]) -> bool:
+        """Whether one of the names of doc holds head immediately followed by one of last."""
+        size = len(head)
+        for tokens in self.tokens[doc]:
+            for i in range(len(tokens) - size):
+                if tokens[i + size] in last and tokens[i:i + size] == list(head):
+                    return True
+        return False
+
+
+class LocalSearch:
+    """
+    In-memory name search over downloaded game data, answering index_search without a round trip.
+    Names are matched in every language, following the semantics of the string algorithms of XIVAPI's Elasticsearch
+    queries: term, prefix, fuzzy, match, match_phrase, match_phrase_prefix, wildcard and wildcard_plus. Searches on
+    indexes which aren't loaded, or using another algorithm, go to XIVAPI.
+    Parameters
+    ------------
+    client: XIVAPIClient
+        The client used for searches which can't be answered locally.
+    name_columns: Optional[Dict[str, str]]
+        The column holding the name in each language. Defaults to Name_en, Name_fr, Name_de and Name_ja.
+    """
+
+    def __init__(self, client, name_columns: Optional[Dict[str, str]] = None):
+        self.client = client
+        self.name_columns = name_columns or {language: f'Name_{language}' for language in client.languages}
+        self.indexes: Dict[str, _Index] = {}
+
+        self.local = 0
+        self.remote = 0
+
+    def add_index(self, name: str, rows: Iterable[dict]) -> None:
+        """Load the rows of an index, replacing any previously loaded for it."""
+        self.indexes[name] = _Index(name, rows, self.name_columns)
+        __log__.info(f'Loaded {len(self.indexes[name])} rows of {name} for local search')
+
+    def add_mirrored_index(self, mirror, name: str) -> None:
+        """Load an index from a GameDataMirror. It should mirror the name columns of every language."""
+        self.add_index(name, mirror.rows(name))
+
+    def supports(self, indexes: Iterable[str], string_algo: str) -> bool:
+        return string_algo in LOCAL_ALGOS and all(index in self.indexes for index in indexes)
+
+    async def index_search(self, name, indexes=(), columns=(), filters: List[Filter] = (), sort: Sort = None, page=1, per_page=10, language="en", string_algo="match"):
+        """|coro|
+        Same as XIVAPIClient.index_search, answered locally when every index is loaded and string_algo is supported.
+        """
+        if not self.supports(indexes, string_algo):
+            self.remote += 1
+            return await self.client.index_search(name, indexes, columns, filters, sort, page, per_page, language, string_algo)
+
+        self.local += 1
+        result = self.search(name, indexes, columns, filters, sort, page, per_page, language, string_algo)
+        return SearchPage(result) if self.client.models else result
+
+    def search(self, name, indexes=(), columns=(), filters: List[Filter] = (), sort: Sort = None, page=1, per_page=10, language="en", string_algo="match") -> dict:
+        """
+        Search the loaded indexes, returning a response shaped like XIVAPI's.
+        """
+        if len(indexes) == 0:
+            raise XIVAPIInvalidIndex("Please specify at least one index to search for, e.g. [\"Recipe\"]")
+
+        if language.lower() not in self.client.languages:
+            raise XIVAPIInvalidLanguage(f'"{language}" is not a valid language code for XIVAPI.')
+
+        if len(columns) == 0:
+            raise XIVAPIInvalidColumns("Please specify at least one column to return in the resulting data.")
+
+        if string_algo not in self.client.string_algos:
+            raise XIVAPIInvalidAlgo(f'"{string_algo}" is not a supported string_algo for XIVAPI')
+
+        hits = []
+        for index_name in dict.fromkeys(indexes):
+            index = self.indexes[index_name]
+            for doc, score in index.match(string_algo, name).items():
+                row = index.rows[doc]
+                if all(self._passes(row, f) for f in filters):
+                    hits.append((score, index_name, row))
+
+        if sort:
+            hits.sort(key=lambda hit: hit[2].get("ID") or 0)
+            present = [hit for hit in hits if _value(hit[2], sort.Field) is not None]
+            present.sort(key=lambda hit: _value(hit[2], sort.Field), reverse=not sort.Ascending)
+            hits = present + [hit for hit in hits if _value(hit[2], sort.Field) is None]
+        else:
+            hits.sort(key=lambda hit: (-hit[0], hit[2].get("ID") or 0))
+
+        total = len(hits)
+        page_total = max(1, -(-total // per_page))
+        start = (page - 1) * per_page
+        return {
+            "Pagination": {
+                "Page": page,
+                "PageNext": page + 1 if page < page_total else None,
+                "PagePrev": page - 1 if page > 1 else None,
+                "PageTotal": page_total,
+                "Results": len(hits[start:start + per_page]),
+                "ResultsPerPage": per_page,
+                "ResultsTotal": total,
+            },
+            "Results": [self._project(row, index_name, score, columns, language) for score, index_name, row in hits[start:start + per_page]],
+        }
+
+    @staticmethod
+    def _passes(row: dict, f: Filter) -> bool:
+        value = _value(row, f.Field)
+        if f.Comparison == "ne":
+            # must_not lets rows without the field through.
+            return value != f.Value
+        if value is None:
+            return False
+        if f.Comparison == "eq":
+            return value == f.Value
+        if f.Comparison == "in":
+            return value in f.Value
+        if f.Comparison == "gt":
+            return value > f.Value
+        if f.Comparison == "gte":
+            return value >= f.Value
+        if f.Comparison == "lt":
+            return value < f.Value
+        return value <= f.Value
+
+    def _project(self, row: dict, index_name: str, score: float, columns: Iterable[str], language: str) -> dict:
+        projected = {}
+        for column in columns:
+            key = column.split(".")[0]
+            if key == "Name" and self.name_columns.get(language) in row:
+                # Name is the name in the requested language, as XIVAPI does, even when the row has a Name column.
+                projected[key] = row[self.name_columns[language]]
+            elif key in row:
+                projected[key] = row[key]
+        projected["_"] = index_name.lower()
+        projected["_Score"] = score
+        return projected
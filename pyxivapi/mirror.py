@@ -0,0 +1,203 @@
+import hashlib
+import logging
+import sqlite3
+from time import time
+from typing import Dict, Iterable, Iterator, Optional
+
+from .decoders import default_encoder
+from .exceptions import XIVAPIInvalidIndex
+from .models import IndexRow
+
+__log__ = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mirrored_index (
+    name TEXT PRIMARY KEY,
+    columns TEXT NOT NULL,
+    language TEXT NOT NULL,
+    patch TEXT,
+    rows INTEGER NOT NULL DEFAULT 0,
+    synced_at REAL
+);
+CREATE TABLE IF NOT EXISTS mirrored_row (
+    name TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    hash BLOB NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (name, id)
+) WITHOUT ROWID;
+"""
+
+
+class GameDataMirror:
+    """
+    Local copy of selected game data indexes in an SQLite database, serving index_by_id lookups without a round trip.
+    Static game data only changes with game patches, so a sync only downloads an index again when XIVAPI reports a
+    new patch, and only writes the rows which changed.
+    Parameters
+    ------------
+    client: XIVAPIClient
+        The client used to download the indexes.
+    path: str
+        The path of the SQLite database, created if need be. ":memory:" keeps the mirror in memory.
+    indexes: Dict[str, Iterable[str]]
+        The columns to mirror for each index, e.g. {"Item": ["ID", "Name", "Icon", "LevelItem"]}. ID is always kept.
+    language: str
+        The language of the mirrored data. Defaults to English (en).
+    page_size: int
+        The number of rows downloaded per request, up to 3000. Defaults to 3000.
+    prefetch: int
+        The number of pages downloaded ahead of the one being stored. Defaults to 2.
+    """
+
+    def __init__(self, client, path: str, indexes: Dict[str, Iterable[str]], language: str = "en", page_size: int = 3000, prefetch: int = 2):
+        self.client = client
+        self.path = path
+        self.indexes = {index: ",".join(sorted(set(columns) | {"ID"})) for index, columns in indexes.items()}
+        self.language = language
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.encoder = default_encoder()
+
+        self.hits = 0
+        self.misses = 0
+
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "GameDataMirror":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def status(self) -> Dict[str, dict]:
+        """The columns, language, patch, row count and last sync time of each mirrored index."""
+        cursor = self._db.execute("SELECT name, columns, language, patch, rows, synced_at FROM mirrored_index")
+        return {
+            name: {"columns": columns.split(","), "language": language, "patch": patch, "rows": rows, "synced_at": synced_at}
+            for name, columns, language, patch, rows, synced_at in cursor
+        }
+
+    async def latest_patch(self) -> str:
+        """|coro|
+        The version of the latest game patch known to XIVAPI.
+        """
+        patches = await self.client.patch_list()
+        latest = max(patches, key=lambda patch: patch["ID"])
+        return str(latest.get("Version") or latest["ID"])
+
+    async def sync(self, force: bool = False) -> Dict[str, int]:
+        """|coro|
+        Download every index mirrored for an older patch, another language or other columns.
+        Returns the number of rows added, changed or removed per index downloaded.
+        Parameters
+        ------------
+        Optional[force: bool]
+            Download every index, even if it is up to date. Defaults to False.
+        """
+        patch = await self.latest_patch()
+        status = self.status()
+
+        changes = {}
+        for index, columns in self.indexes.items():
+            mirrored = status.get(index)
+            if not force and mirrored is not None and mirrored["patch"] == patch \
+                    and mirrored["language"] == self.language and ",".join(mirrored["columns"]) == columns:
+                continue
+
+            changes[index] = await self._sync_index(index, columns, patch)
+
+        return changes
+
+    async def _sync_index(self, index: str, columns: str, patch: str) -> int:
+        __log__.info(f'Syncing {index} for patch {patch}')
+
+        # Compare against what is already mirrored so that unchanged rows are not written again.
+        hashes = dict(self._db.execute("SELECT id, hash FROM mirrored_row WHERE name = ?", (index,)))
+        seen = set()
+        changed = 0
+        batch = []
+
+        async for row in self.client.iter_index_list(index, columns.split(","), limit=self.page_size, language=self.language, prefetch=self.prefetch):
+            if isinstance(row, IndexRow):
+                row = row.to_dict()
+
+            content_id = row["ID"]
+            seen.add(content_id)
+
+            data = self.encoder(row)
+            digest = hashlib.blake2b(data, digest_size=8).digest()
+            if hashes.get(content_id) != digest:
+                batch.append((index, content_id, digest, data))
+
+            if len(batch) >= self.page_size:
+                changed += self._write(batch)
+                batch = []
+
+        changed += self._write(batch)
+
+        removed = [(index, content_id) for content_id in hashes if content_id not in seen]
+        with self._db:
+            self._db.executemany("DELETE FROM mirrored_row WHERE name = ? AND id = ?", removed)
+            self._db.execute(
+                "INSERT OR REPLACE INTO mirrored_index (name, columns, language, patch, rows, synced_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (index, columns, self.language, patch, len(seen), time())
+            )
+
+        return changed + len(removed)
+
+    def _write(self, batch) -> int:
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO mirrored_row (name, id, hash, data) VALUES (?, ?, ?, ?)", batch)
+        return len(batch)
+
+    def rows(self, index: str) -> Iterator[dict]:
+        """Iterate over every mirrored row of an index, in ID order."""
+        cursor = self._db.execute("SELECT data FROM mirrored_row WHERE name = ? ORDER BY id", (index,))
+        for data, in cursor:
+            yield self.client.decoder(data)
+
+    def mirrors(self, index: str, columns: Iterable[str] = (), language: Optional[str] = None) -> bool:
+        """Whether lookups of columns from index in language can be served by the mirror."""
+        mirrored = self.indexes.get(index)
+        if mirrored is None or (language is not None and language != self.language):
+            return False
+        return set(columns) <= set(mirrored.split(","))
+
+    def get(self, index: str, content_id: int):
+        """
+        Look up a mirrored row, returning None if the index or the row is not mirrored.
+        Rows are dicts, or IndexRow when the client has models enabled.
+        """
+        found = self._db.execute("SELECT data FROM mirrored_row WHERE name = ? AND id = ?", (index, int(content_id))).fetchone()
+        if found is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        row = self.client.decoder(found[0])
+        return IndexRow(row) if self.client.models else row
+
+    async def index_by_id(self, index, content_id: int, columns=(), language="en"):
+        """|coro|
+        Same as XIVAPIClient.index_by_id, served from the mirror when it holds the requested columns.
+        Only the requested columns are returned when served from the mirror.
+        """
+        if index == "":
+            raise XIVAPIInvalidIndex("Please specify an index to search on, e.g. \"Item\"")
+
+        if self.mirrors(index, columns, language):
+            row = self.get(index, content_id)
+            if row is not None:
+                if columns:
+                    # Nested columns such as ItemUICategory.Name come back under their top level key.
+                    keys = dict.fromkeys(column.split(".")[0] for column in columns)
+                    row = {key: row[key] for key in keys if key in row}
+                    return IndexRow(row) if self.client.models else row
+                return row
+
+        return await self.client.index_by_id(index, content_id, columns, language)
@@ -1,23 +1,42 @@
+from typing import Optional
+
 from .exceptions import XIVAPIInvalidFilter
 
 
 class Filter:
     """
     Model class for DQL filters
+    Range comparisons are gt, gte, lt & lte. eq matches an exact value, ne excludes one, and in matches any value of
+    a list.
     """
 
-    comparisons = ["gt", "gte", "lt", "lte"]
+    range_comparisons = ["gt", "gte", "lt", "lte"]
+    comparisons = range_comparisons + ["eq", "ne", "in"]
 
-    def __init__(self, field: str, comparison: str, value: int):
+    def __init__(self, field: str, comparison: str, value):
         comparison = comparison.lower()
 
         if comparison not in self.comparisons:
             raise XIVAPIInvalidFilter(f'"{comparison}" is not a valid DQL filter comparison.')
 
+        if comparison == "in" and (isinstance(value, (str, bytes)) or not hasattr(value, "__iter__")):
+            raise XIVAPIInvalidFilter(f'The "in" comparison takes a list of values, not {value!r}.')
+
+        if comparison == "in":
+            value = list(value)
+
         self.Field = field
         self.Comparison = comparison
         self.Value = value
 
+    def clause(self) -> dict:
+        """The Elasticsearch clause of the filter. ne clauses belong in bool.must_not."""
+        if self.Comparison in self.range_comparisons:
+            return {"range": {self.Field: {self.Comparison: self.Value}}}
+        if self.Comparison == "in":
+            return {"terms": {self.Field: self.Value}}
+        return {"term": {self.Field: self.Value}}
+
 
 class Sort:
     """
@@ -27,3 +46,340 @@ class Sort:
     def __init__(self, field: str, ascending: bool):
         self.Field = field
         self.Ascending = ascending
+
+
+class lazy:
+    """
+    Descriptor for a model section which is only parsed when first accessed.
+    The raw section waits in the model's _pending dict, and the parsed value is kept in the slot named after the
+    section with a leading underscore.
+    """
+
+    def __init__(self, parser=None):
+        self.parser = parser
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.slot = "_" + name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+
+        pending = obj._pending
+        if pending is not None and self.name in pending:
+            raw = pending.pop(self.name)
+            if not pending:
+                obj._pending = None
+            setattr(obj, self.slot, self.parser(raw) if self.parser is not None and raw is not None else raw)
+
+        return getattr(obj, self.slot, None)
+
+
+class eager(lazy):
+    """
+    Descriptor for a small model section which is parsed with the model, since keeping it raw until first accessed
+    would save nothing.
+    """
+
+
+def _list_of(model):
+    return lambda rows: [model(row) for row in rows]
+
+
+class Model:
+    """
+    Base class of the slotted models returned by XIVAPIClient when models are enabled.
+    Only the fields and sections listed by a model are kept from a response.
+    """
+
+    __slots__ = ("_pending",)
+
+    fields = ()
+    sections = ()
+
+    def __init__(self, data: dict, sections: dict = None):
+        for field in self.fields:
+            setattr(self, field, data.get(field))
+
+        if sections is None:
+            sections = data
+        pending = None
+        for name in self.sections:
+            if name not in sections:
+                continue
+            raw = sections[name]
+            descriptor = getattr(type(self), name)
+            if isinstance(descriptor, eager):
+                setattr(self, descriptor.slot, descriptor.parser(raw) if descriptor.parser is not None and raw is not None else raw)
+            else:
+                if pending is None:
+                    pending = {}
+                pending[name] = raw
+        self._pending = pending
+
+    def __repr__(self):
+        values = ", ".join(f'{field}={getattr(self, field)!r}' for field in self.fields[:3])
+        return f'{type(self).__name__}({values})'
+
+
+class ClassJob(Model):
+    """
+    Model class for a character's class or job
+    """
+
+    fields = ("ClassID", "JobID", "Name", "Level", "ExpLevel", "ExpLevelMax", "ExpLevelTogo", "IsSpecialised", "UnlockedState")
+    __slots__ = fields
+
+
+class Achievement(Model):
+    """
+    Model class for an achievement unlocked by a character
+    """
+
+    fields = ("ID", "Date")
+    __slots__ = fields
+
+
+class Achievements(Model):
+    """
+    Model class for the achievements section of a character
+    """
+
+    fields = ("Points",)
+    sections = ("List",)
+    __slots__ = fields + ("_List",)
+
+    List = lazy(_list_of(Achievement))
+
+
+class Collectable(Model):
+    """
+    Model class for a minion or mount owned by a character
+    """
+
+    fields = ("Name", "Icon")
+    __slots__ = fields
+
+
+class CharacterSummary(Model):
+    """
+    Model class for a character listed in search results or in a Free Company, Linkshell or PvPTeam
+    """
+
+    fields = ("ID", "Name", "Server", "Avatar", "Rank", "RankIcon", "Lang", "FeastMatches")
+    __slots__ = fields
+
+
+class Character(Model):
+    """
+    Model class for a character_by_id response
+    """
+
+    fields = (
+        "ID", "Name", "Server", "DC", "Race", "Tribe", "Gender", "Title", "TitleTop", "Nameday", "Town",
+        "GuardianDeity", "GrandCompany", "Bio", "Avatar", "Portrait", "Lang", "FreeCompanyId", "FreeCompanyName",
+        "PvPTeamId", "ParseDate", "AchievementsPublic", "FriendsPublic"
+    )
+    sections = (
+        "ActiveClassJob", "ClassJobs", "ClassJobsBozjan", "ClassJobsElemental", "GearSet", "Achievements", "Minions",
+        "Mounts", "Friends", "FreeCompany", "FreeCompanyMembers", "PvPTeam"
+    )
+    __slots__ = fields + tuple("_" + section for section in sections)
+
+    def __init__(self, response: dict):
+        profile = response.get("Character") or {}
+        # AchievementsPublic, FriendsPublic and the sections other than the profile's are found next to Character.
+        merged = dict(profile, **{k: v for k, v in response.items() if k != "Character"})
+        super().__init__(merged, merged)
+
+    ActiveClassJob = eager(ClassJob)
+    ClassJobs = eager(_list_of(ClassJob))
+    ClassJobsBozjan = eager()
+    ClassJobsElemental = eager()
+    GearSet = eager()
+    Achievements = eager(Achievements)
+    Minions = lazy(_list_of(Collectable))
+    Mounts = lazy(_list_of(Collectable))
+    Friends = lazy(_list_of(CharacterSummary))
+    FreeCompany = eager(lambda data: FreeCompany({"FreeCompany": data}))
+    FreeCompanyMembers = lazy(_list_of(CharacterSummary))
+    PvPTeam = eager(lambda data: PvPTeam({"PvPTeam": data}))
+
+
+class FreeCompany(Model):
+    """
+    Model class for a freecompany_by_id response
+    """
+
+    fields = (
+        "ID", "Name", "Tag", "Server", "DC", "Slogan", "Rank", "Formed", "GrandCompany", "Active",
+        "ActiveMemberCount", "Recruitment", "ParseDate"
+    )
+    sections = ("Crest", "Estate", "Focus", "Seeking", "Ranking", "Reputation", "FreeCompanyMembers")
+    __slots__ = fields + tuple("_" + section for section in sections)
+
+    def __init__(self, response: dict):
+        profile = response.get("FreeCompany") or {}
+        super().__init__(profile, dict(profile, FreeCompanyMembers=response.get("FreeCompanyMembers")))
+
+    Crest = eager()
+    Estate = eager()
+    Focus = eager()
+    Seeking = eager()
+    Ranking = eager()
+    Reputation = eager()
+    FreeCompanyMembers = lazy(_list_of(CharacterSummary))
+
+
+class Linkshell(Model):
+    """
+    Model class for a linkshell_by_id response
+    """
+
+    fields = ("ID", "Name", "Server", "DC", "ParseDate")
+    sections = ("Results",)
+    __slots__ = fields + ("_Results",)
+
+    def __init__(self, response: dict):
+        linkshell = response.get("Linkshell") or response
+        profile = linkshell.get("Profile") or linkshell
+        super().__init__(profile, linkshell)
+
+    Results = lazy(_list_of(CharacterSummary))
+
+
+class PvPTeam(Model):
+    """
+    Model class for a pvpteam_by_id response
+    """
+
+    fields = ("ID", "Name", "Server", "DC", "Formed", "ParseDate")
+    sections = ("Crest", "PvPTeamMembers")
+    __slots__ = fields + ("_Crest", "_PvPTeamMembers")
+
+    def __init__(self, response: dict):
+        profile = response.get("PvPTeam") or {}
+        super().__init__(profile, dict(profile, PvPTeamMembers=response.get("PvPTeamMembers")))
+
+    Crest = eager()
+    PvPTeamMembers = lazy(_list_of(CharacterSummary))
+
+
+# Number of column sets whose schema is shared between rows. Rows with other columns get a schema of their own, so
+# varied projections can't grow the registry for the life of the process.
+MAX_SCHEMAS = 256
+
+_schemas = {}
+
+
+class IndexRow:
+    """
+    Model class for a row of game data.
+    Columns are read as attributes or items, e.g. row.Name or row["ItemUICategory"]. Rows sharing the same columns
+    share a single schema, so each row only stores a tuple of values.
+    """
+
+    __slots__ = ("_schema", "_values")
+
+    def __init__(self, data: dict):
+        columns = tuple(data)
+        schema = _schemas.get(columns)
+        if schema is None:
+            schema = {column: i for i, column in enumerate(columns)}
+            if len(_schemas) < MAX_SCHEMAS:
+                _schemas[columns] = schema
+
+        self._schema = schema
+        self._values = tuple(data.values())
+
+    def __getattr__(self, name):
+        # Private names are never columns, and looking them up on a row being unpickled would recurse.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self._values[self._schema[name]]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __reduce__(self):
+        # Rebuilt from its columns, so the copy shares the schema of other rows.
+        return IndexRow, (self.to_dict(),)
+
+    def __getitem__(self, name):
+        return self._values[self._schema[name]]
+
+    def __contains__(self, name):
+        return name in self._schema
+
+    def get(self, name, default=None):
+        index = self._schema.get(name)
+        return default if index is None else self._values[index]
+
+    def keys(self):
+        return self._schema.keys()
+
+    def to_dict(self) -> dict:
+        return dict(zip(self._schema, self._values))
+
+    def __repr__(self):
+        return f'IndexRow({self.to_dict()!r})'
+
+
+class SearchPage(Model):
+    """
+    Model class for a page of search results
+    """
+
+    fields = ("Page", "PageNext", "PagePrev", "PageTotal", "ResultsPerPage", "ResultsTotal")
+    sections = ("Results",)
+    __slots__ = fields + ("_Results", "_row")
+
+    def __init__(self, response: dict, row=IndexRow):
+        self._row = row
+        super().__init__(response.get("Pagination") or {}, response)
+
+    @property
+    def Results(self):
+        pending = self._pending
+        if pending is not None and "Results" in pending:
+            self._Results = [self._row(row) for row in pending.pop("Results") or ()]
+            self._pending = None
+        return getattr(self, "_Results", None)
+
+    def __iter__(self):
+        return iter(self.Results or ())
+
+    def __len__(self):
+        return len(self.Results or ())
+
+
+class RosterMember:
+    """
+    A member of a Free Company roster, with their profile or the error which prevented fetching it.
+    Attributes
+    ------------
+    ID: int
+        The member's Lodestone ID.
+    member: dict
+        The member's entry of the roster, with their name, rank and avatar.
+    profile: Optional[Union[dict, Character]]
+        The member's profile, None when it couldn't be fetched.
+    error: Optional[Exception]
+        The error raised fetching the profile, None when it was fetched.
+    cached: bool
+        Whether the profile was a fresh copy from the cache, served without a request.
+    """
+
+    __slots__ = ("ID", "member", "profile", "error", "cached")
+
+    def __init__(self, member: dict, profile=None, error: Optional[Exception] = None, cached: bool = False):
+        self.ID = member.get("ID")
+        self.member = member
+        self.profile = profile
+        self.error = error
+        self.cached = cached
+
+    def __repr__(self):
+        state = "cached" if self.cached else "failed" if self.error is not None else "fetched"
+        return f'RosterMember({self.ID!r}, {state})'
@@ -0,0 +1,134 @@
+import json
+import re
+from typing import Iterable, List, Optional
+
+from .decoders import default_encoder
+from .exceptions import XIVAPIInvalidAlgo, XIVAPIInvalidColumns, XIVAPIInvalidIndex, XIVAPIInvalidLanguage
+from .models import Filter, Sort
+
+LANGUAGES = ("en", "fr", "de", "ja")
+
+STRING_ALGOS = (
+    "custom", "wildcard", "wildcard_plus", "fuzzy", "term", "prefix", "match", "match_phrase",
+    "match_phrase_prefix", "multi_match", "query_string"
+)
+
+# Placeholders for the values bound on each call, encoded once into the template and split on afterwards.
+_SLOT = "\x00{}\x00"
+_SLOTS = re.compile(r'"\\u0000(name|from|size)\\u0000"')
+
+
+class SearchQuery:
+    """
+    A reusable index_search query, validated and serialized once so that each call only binds the name and page.
+    Pass it to XIVAPIClient.index_search_query or iter_index_search_query.
+    Parameters
+    ------------
+    indexes: list
+        A named list of indexes to search XIVAPI. At least one must be specified.
+        e.g. ["Recipe", "Item"]
+    columns: list
+        A named list of columns to return in the response.
+        e.g. ["ID", "Name", "Icon"]
+    Optional[filters: list]
+        A list of type Filter, e.g. [Filter("LevelItem", "gte", 100), Filter("ClassJobCategory.ID", "eq", 1)]
+    Optional[sort: Sort]
+        The name of the column to sort on.
+    Optional[must: list]
+        Elasticsearch clauses every result must match, added to bool.must as they are.
+        e.g. [{"term": {"IsUntradable": 0}}]
+    Optional[per_page: int]
+        The number of results per page. Defaults to 10.
+    Optional[language: str]
+        The two character length language code that indicates the language to return the response in. Defaults to English (en).
+    Optional[string_algo: str]
+        The search algorithm to use for string matching (default = "match")
+    """
+
+    __slots__ = ("indexes", "columns", "filters", "sort", "must", "per_page", "language", "string_algo", "_parts", "_encode")
+
+    def __init__(self, indexes: Iterable[str], columns: Iterable[str], filters: Iterable[Filter] = (), sort: Optional[Sort] = None, must: Iterable[dict] = (), per_page: int = 10, language: str = "en", string_algo: str = "match"):
+        self.indexes = list(indexes)
+        self.columns = list(columns)
+        self.filters = list(filters)
+        self.sort = sort
+        self.must = list(must)
+        self.per_page = per_page
+        self.language = language
+        self.string_algo = string_algo
+
+        if len(self.indexes) == 0:
+            raise XIVAPIInvalidIndex("Please specify at least one index to search for, e.g. [\"Recipe\"]")
+
+        if language.lower() not in LANGUAGES:
+            raise XIVAPIInvalidLanguage(f'"{language}" is not a valid language code for XIVAPI.')
+
+        if len(self.columns) == 0:
+            raise XIVAPIInvalidColumns("Please specify at least one column to return in the resulting data.")
+
+        if string_algo not in STRING_ALGOS:
+            raise XIVAPIInvalidAlgo(f'"{string_algo}" is not a supported string_algo for XIVAPI')
+
+        template = json.dumps(self.to_dict(_SLOT.format("name"), _SLOT.format("from"), _SLOT.format("size")), separators=(",", ":"), ensure_ascii=False)
+        pieces = _SLOTS.split(template)
+        # Alternating literal bytes and slot names, ending with a literal.
+        self._parts: List = [piece.encode("utf-8") if i % 2 == 0 else piece for i, piece in enumerate(pieces)]
+        self._encode = default_encoder()
+
+    def to_dict(self, name, start=0, size=None) -> dict:
+        """The body of the search request, as sent by index_search."""
+        clauses = [{
+            self.string_algo: {
+                f'NameCombined_{language}': {
+                    "query": name,
+                    "fuzziness": "AUTO",
+                    "prefix_length": 1,
+                    "max_expansions": 50
+                }
+            }
+        } for language in ("en", "de", "fr", "ja")]
+
+        body = {
+            "indexes": ",".join(sorted(set(self.indexes))),
+            "columns": ",".join(sorted(set(self.columns))),
+            "body": {
+                "query": {
+                    "bool": {
+                        "should": clauses
+                    }
+                },
+                "from": start,
+                "size": self.per_page if size is None else size
+            }
+        }
+
+        query = body["body"]["query"]["bool"]
+        if self.must:
+            query["must"] = self.must
+
+        filters = [f.clause() for f in self.filters if f.Comparison != "ne"]
+        if filters:
+            query["filter"] = filters
+
+        excluded = [f.clause() for f in self.filters if f.Comparison == "ne"]
+        if excluded:
+            query["must_not"] = excluded
+
+        if self.sort:
+            body["body"]["sort"] = [{
+                self.sort.Field: "asc" if self.sort.Ascending else "desc"
+            }]
+
+        return body
+
+    def body(self, name: str, page: int = 1) -> bytes:
+        """The serialized body of the search request for name and page."""
+        values = {
+            "name": self._encode(name),
+            "from": str((page - 1) * self.per_page).encode("ascii"),
+            "size": str(self.per_page).encode("ascii"),
+        }
+        return b"".join(part if i % 2 == 0 else values[part] for i, part in enumerate(self._parts))
+
+    def __repr__(self):
+        return f'SearchQuery(indexes={self.indexes!r}, columns={self.columns!r}, string_algo={self.string_algo!r})'
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+from time import monotonic
+from typing import Deque, Dict, Optional, Tuple
+
+__log__ = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter with an optional cap on the number of requests in flight.
+    Use it as an async context manager around each request. Callers are served in arrival order.
+    A limiter isn't bound to an event loop, so clients running on different loops, e.g. a SyncXIVAPIClient and an
+    XIVAPIClient, can share one.
+    Parameters
+    ------------
+    rate: float
+        The sustained number of requests allowed per second. Defaults to 20, XIVAPI's per-key limit.
+    burst: Optional[int]
+        The number of requests that may be sent at once after a quiet period. Defaults to rate.
+    max_in_flight: Optional[int]
+        The maximum number of requests awaiting a response at any time. Unbounded by default.
+    """
+
+    _shared: Dict[str, "RateLimiter"] = {}
+
+    def __init__(self, rate: float = 20, burst: Optional[int] = None, max_in_flight: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.max_in_flight = max_in_flight
+
+        self._tokens = float(self.burst)
+        self._updated = monotonic()
+        # Guards the bucket and the slots, which callers on other loops and threads may be using at the same time.
+        self._lock = threading.Lock()
+        self._slots = max_in_flight
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+        self.waiting = 0
+        self.in_flight = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @classmethod
+    def shared(cls, api_key: str, **kwargs) -> "RateLimiter":
+        """
+        Return the limiter shared by every client using api_key, creating it with kwargs on first use.
+        Later kwargs differing from the settings of the existing limiter are ignored with a warning.
+        """
+        limiter = cls._shared.get(api_key)
+        if limiter is None:
+            limiter = cls._shared[api_key] = cls(**kwargs)
+            return limiter
+
+        differing = {
+            name: value for name, value in kwargs.items()
+            if value is not None and getattr(limiter, name, None) != value
+        }
+        if differing:
+            __log__.warning(f'Ignoring {differing} for the shared limiter of an API key already created with '
+                            f'rate={limiter.rate}, burst={limiter.burst} and max_in_flight={limiter.max_in_flight}')
+        return limiter
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "acquired": self.acquired,
+            "total_wait": self.total_wait,
+            "mean_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+    def delay(self) -> float:
+        """How long in seconds a request arriving now would wait for a token."""
+        tokens = min(self.burst, self._tokens + (monotonic() - self._updated) * self.rate)
+        return max(0.0, (1 - tokens) / self.rate)
+
+    async def acquire(self) -> None:
+        """|coro|
+        Wait for a free slot and a token.
+        """
+        start = monotonic()
+        with self._lock:
+            self.waiting += 1
+        try:
+            if self.max_in_flight is not None:
+                await self._take_slot()
+
+            try:
+                await self._take_token()
+            except BaseException:
+                if self.max_in_flight is not None:
+                    self._give_slot()
+                raise
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        waited = monotonic() - start
+        with self._lock:
+            self.in_flight += 1
+            self.acquired += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        if self.max_in_flight is not None:
+            self._give_slot()
+
+    async def _take_slot(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._slots > 0 and not self._waiters:
+                self._slots -= 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, future))
+                    handed = False
+                except ValueError:
+                    handed = True
+            # A slot handed over before the cancellation is given back here, and one handed over after it by
+            # _hand_over.
+            if handed and not future.cancelled():
+                self._give_slot()
+            raise
+
+    def _give_slot(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                if not loop.is_closed():
+                    # The slot goes straight to the next caller, on its own loop.
+                    loop.call_soon_threadsafe(self._hand_over, future)
+                    return
+            self._slots += 1
+
+    def _hand_over(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self._give_slot()
+        else:
+            future.set_result(None)
+
+    async def _take_token(self) -> None:
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # Reserve a token up front, going into debt if need be, so later callers queue up behind this one.
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if delay > 0:
+            __log__.debug(f'Rate limited, waiting {delay:.3f}s')
+            try:
+                await asyncio.sleep(delay)
+            except BaseException:
+                with self._lock:
+                    self._tokens += 1
+                raise
+
+    async def __aenter__(self) -> "RateLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import random
+from email.utils import parsedate_to_datetime
+from time import time
+from typing import Iterable, Optional, Tuple, Type
+
+from aiohttp import ClientConnectionError, ClientPayloadError
+
+from .exceptions import XIVAPIResponseError
+
+__log__ = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Convert a Retry-After header, given either in seconds or as an HTTP date, into a number of seconds.
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Policy deciding whether and when a failed request is sent again.
+    Parameters
+    ------------
+    max_attempts: int
+        The maximum number of times a request is sent, including the first. Defaults to 3.
+    backoff_base: float
+        The delay in seconds before the first retry, doubled on every further retry. Defaults to 0.5.
+    backoff_cap: float
+        The maximum delay in seconds between two attempts. Defaults to 30. A request XIVAPI asks to retry later
+        than that with Retry-After isn't retried.
+    jitter: bool
+        Whether to pick a random delay between 0 and the backoff, to spread out retries of concurrent requests.
+        Defaults to True.
+    statuses: Iterable[int]
+        The response statuses worth retrying. Defaults to 429, 500, 502, 503 and 504.
+    exceptions: Tuple[Type[BaseException]]
+        The exceptions worth retrying. Defaults to aiohttp connection and payload errors, and timeouts.
+    deadline: Optional[float]
+        The maximum number of seconds a call may take across every attempt. Unbounded by default.
+    """
+
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 0.5, backoff_cap: float = 30,
+                 jitter: bool = True, statuses: Iterable[int] = (429, 500, 502, 503, 504),
+                 exceptions: Tuple[Type[BaseException], ...] = (ClientConnectionError, ClientPayloadError, asyncio.TimeoutError),
+                 deadline: Optional[float] = None):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.exceptions = tuple(exceptions)
+        self.deadline = deadline
+
+    def is_retryable(self, error: BaseException) -> bool:
+        if isinstance(error, XIVAPIResponseError):
+            retry_after = error.retry_after
+            return error.status in self.statuses and (retry_after is None or retry_after <= self.backoff_cap)
+        return isinstance(error, self.exceptions)
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """
+        The number of seconds to wait after the given failed attempt, counted from 1.
+        A Retry-After sent by XIVAPI takes precedence over the computed backoff.
+        """
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            return retry_after
+
+        delay = min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    async def call(self, func, *args, **kwargs):
+        """|coro|
+        Await func(*args, **kwargs), retrying it according to this policy.
+        """
+        started = time()
+        attempt = 0
+        while True:
+            attempt += 1
+
+            remaining = None
+            if self.deadline is not None:
+                remaining = self.deadline - (time() - started)
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f'Gave up after {attempt - 1} attempt(s) and {self.deadline}s')
+
+            try:
+                if remaining is None:
+                    return await func(*args, **kwargs)
+                return await asyncio.wait_for(func(*args, **kwargs), remaining)
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.is_retryable(e):
+                    raise
+
+                delay = self.backoff(attempt, e)
+                if self.deadline is not None and time() - started + delay >= self.deadline:
+                    raise
+
+                __log__.info(f'Attempt {attempt} failed with {e!r}, retrying in {delay:.2f}s')
+                await asyncio.sleep(delay)
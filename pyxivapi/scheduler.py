@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import Deque, Dict, Optional, Tuple
+
+__log__ = logging.getLogger(__name__)
+
+DEFAULT_WEIGHTS = {
+    "interactive": 8,
+    "normal": 4,
+    "bulk": 1,
+}
+
+DEFAULT_PRIORITY = "normal"
+
+
+class Scheduler:
+    """
+    Shares a fixed number of request slots between priority classes with weighted fair queuing.
+    While several classes have requests waiting, each gets free slots in proportion to its weight, so bulk traffic
+    soaks up the capacity interactive traffic leaves and never starves it. Slots can also be reserved for a class:
+    they stay free for it even when other classes are waiting, bounding its latency under any load.
+    Requests wait for a slot before waiting for the rate limiter, so a request only ever queues behind the
+    requests already holding slots.
+    Parameters
+    ------------
+    concurrency: int
+        The number of requests which may hold a slot at once. Defaults to 16.
+    weights: Optional[Dict[str, float]]
+        The weight of each priority class. Defaults to interactive 8, normal 4 and bulk 1.
+    reserved: Optional[Dict[str, int]]
+        The number of slots only usable by a class, e.g. {"interactive": 2}. None by default.
+    """
+
+    def __init__(self, concurrency: int = 16, weights: Optional[Dict[str, float]] = None, reserved: Optional[Dict[str, int]] = None):
+        self.concurrency = concurrency
+        self.weights = dict(weights) if weights is not None else dict(DEFAULT_WEIGHTS)
+        self.reserved = dict(reserved) if reserved is not None else {}
+
+        for priority in self.reserved:
+            if priority not in self.weights:
+                raise ValueError(f'"{priority}" is not a priority class of the scheduler')
+        if sum(self.reserved.values()) >= concurrency:
+            raise ValueError("reserved slots must leave at least one shared slot")
+
+        self._queues: Dict[str, Deque[Tuple[asyncio.Future, float]]] = {priority: deque() for priority in self.weights}
+        self._running = dict.fromkeys(self.weights, 0)
+        self._virtual = dict.fromkeys(self.weights, 0.0)
+        self._clock = 0.0
+
+        self.dispatched = dict.fromkeys(self.weights, 0)
+        self.total_wait = dict.fromkeys(self.weights, 0.0)
+        self.max_wait = dict.fromkeys(self.weights, 0.0)
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Waiting and running requests, dispatches and waits per priority class."""
+        return {
+            priority: {
+                "waiting": len(self._queues[priority]),
+                "running": self._running[priority],
+                "dispatched": self.dispatched[priority],
+                "mean_wait": self.total_wait[priority] / self.dispatched[priority] if self.dispatched[priority] else 0.0,
+                "max_wait": self.max_wait[priority],
+            } for priority in self.weights
+        }
+
+    async def acquire(self, priority: Optional[str] = None) -> None:
+        """|coro|
+        Wait for a slot for a request of a priority class, "normal" by default.
+        """
+        priority = priority or DEFAULT_PRIORITY
+        queue = self._queues.get(priority)
+        if queue is None:
+            raise ValueError(f'"{priority}" is not a priority class of the scheduler')
+
+        if not queue:
+            # A class coming back from idle starts at the current virtual time, rather than with credit it saved up.
+            self._virtual[priority] = max(self._virtual[priority], self._clock)
+
+        future = asyncio.get_running_loop().create_future()
+        queue.append((future, monotonic()))
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted a slot at the same time as being cancelled.
+                self.release(priority)
+            raise
+
+    def release(self, priority: Optional[str] = None) -> None:
+        self._running[priority or DEFAULT_PRIORITY] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[str] = None):
+        """Hold a slot for a request of a priority class while in the context."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def _allowed(self, priority: str, free: int) -> bool:
+        # Slots reserved for other classes, and not used by them, are out of bounds.
+        held = sum(
+            max(0, reserved - self._running[other])
+            for other, reserved in self.reserved.items() if other != priority
+        )
+        return free > held
+
+    def _dispatch(self) -> None:
+        while True:
+            free = self.concurrency - sum(self._running.values())
+            if free <= 0:
+                return
+
+            waiting = [priority for priority, queue in self._queues.items() if queue and self._allowed(priority, free)]
+            if not waiting:
+                return
+
+            priority = min(waiting, key=self._virtual.__getitem__)
+            future, queued = self._queues[priority].popleft()
+            if future.cancelled():
+                continue
+
+            # The class's virtual time moves on by the inverse of its weight, so heavier classes are picked more often.
+            self._clock = self._virtual[priority]
+            self._virtual[priority] += 1 / self.weights[priority]
+
+            self._running[priority] += 1
+            waited = monotonic() - queued
+            self.dispatched[priority] += 1
+            self.total_wait[priority] += waited
+            self.max_wait[priority] = max(self.max_wait[priority], waited)
+            future.set_result(None)
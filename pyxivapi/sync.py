@@ -0,0 +1,130 @@
+import asyncio
+import concurrent.futures
+import inspect
+import logging
+import threading
+from functools import wraps
+from typing import Optional
+
+from .client import XIVAPIClient
+
+__log__ = logging.getLogger(__name__)
+
+
+class SyncXIVAPIClient:
+    """
+    Blocking client for threaded and WSGI applications.
+    Runs an XIVAPIClient on an event loop in a background thread, so that every call made from any thread reuses the
+    same connection pool. Every coroutine of XIVAPIClient is available as a blocking method, and every iter_* method
+    as a regular iterator.
+    Parameters
+    ------------
+    api_key: str
+        The API key used for identifying your application with XIVAPI.com.
+    max_concurrency: Optional[int]
+        The maximum number of calls running at the same time, across every thread. Unbounded by default.
+    timeout: Optional[float]
+        The maximum number of seconds a calling thread waits for a call. Unbounded by default.
+    **kwargs
+        Any other parameter of XIVAPIClient, e.g. cache, rate_limiter or retry_policy.
+    """
+
+    def __init__(self, api_key: str, max_concurrency: Optional[int] = None, timeout: Optional[float] = None, **kwargs):
+        self.timeout = timeout
+        self.client = XIVAPIClient(api_key, **kwargs)
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="pyxivapi", daemon=True)
+        self._thread.start()
+        self._semaphore = self._submit(self._create_semaphore(max_concurrency))
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @staticmethod
+    async def _create_semaphore(max_concurrency: Optional[int]) -> Optional[asyncio.Semaphore]:
+        # Created on the loop so that it is bound to it on every version of Python.
+        return asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def _bounded(self, coro):
+        if self._semaphore is None:
+            return await coro
+        async with self._semaphore:
+            return await coro
+
+    def _check(self) -> None:
+        if self._loop.is_closed():
+            raise RuntimeError("SyncXIVAPIClient is closed")
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("SyncXIVAPIClient can't be called from its own event loop")
+
+    def _submit(self, coro):
+        """Run coro on the background loop and wait for its result, cancelling it on timeout."""
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(self.timeout)
+        except concurrent.futures.TimeoutError:
+            # Otherwise it would keep running on the loop, holding its slot of max_concurrency.
+            future.cancel()
+            raise
+
+    def _iterate(self, iterator):
+        try:
+            while True:
+                self._check()
+                try:
+                    yield self._submit(self._bounded(iterator.__anext__()))
+                except StopAsyncIteration:
+                    return
+        finally:
+            if not self._loop.is_closed():
+                self._submit(iterator.aclose())
+
+    def close(self) -> None:
+        """
+        Close the client's session and stop the background event loop.
+        """
+        if self._loop.is_closed():
+            return
+
+        self._submit(self.client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> "SyncXIVAPIClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _blocking_doc(func) -> str:
+    return (func.__doc__ or "").replace("|coro|", "Blocking version of XIVAPIClient.%s." % func.__name__, 1)
+
+
+def _blocking(name: str, func):
+    @wraps(func)
+    def method(self, *args, **kwargs):
+        self._check()
+        return self._submit(self._bounded(getattr(self.client, name)(*args, **kwargs)))
+    method.__doc__ = _blocking_doc(func)
+    return method
+
+
+def _iterating(name: str, func):
+    @wraps(func)
+    def method(self, *args, **kwargs):
+        self._check()
+        return self._iterate(getattr(self.client, name)(*args, **kwargs))
+    return method
+
+
+for _name, _func in inspect.getmembers(XIVAPIClient, inspect.isfunction):
+    if _name.startswith("_") or _name in ("close", "process_response"):
+        continue
+    if _name.startswith("iter_"):
+        setattr(SyncXIVAPIClient, _name, _iterating(_name, _func))
+    elif inspect.iscoroutinefunction(_func):
+        setattr(SyncXIVAPIClient, _name, _blocking(_name, _func))
@@ -0,0 +1,63 @@
+from typing import Optional
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+
+class TransportOptions:
+    """
+    Connection pool and timeout settings for the session managed by XIVAPIClient.
+    Parameters
+    ------------
+    limit: int
+        The maximum number of open connections. Defaults to 100.
+    limit_per_host: int
+        The maximum number of open connections to a single host, 0 meaning no limit. Defaults to 0.
+    keepalive_timeout: float
+        How long in seconds an idle connection is kept open for reuse. Defaults to 30.
+    dns_cache_ttl: Optional[int]
+        How long in seconds DNS lookups are cached, None caching them forever. Defaults to 300.
+    connect_timeout: Optional[float]
+        The maximum number of seconds to acquire a connection and connect to XIVAPI. Defaults to 10.
+    read_timeout: Optional[float]
+        The maximum number of seconds between two reads from a connection. Defaults to 30.
+    total_timeout: Optional[float]
+        The maximum number of seconds a request may take in total. Defaults to 60.
+    compress: bool
+        Whether to ask for compressed responses. Defaults to True.
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 0, keepalive_timeout: float = 30,
+                 dns_cache_ttl: Optional[int] = 300, connect_timeout: Optional[float] = 10,
+                 read_timeout: Optional[float] = 30, total_timeout: Optional[float] = 60, compress: bool = True):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.compress = compress
+
+    def create_session(self, **kwargs) -> ClientSession:
+        """
+        Create a ClientSession using these settings. Extra keyword arguments are passed on to the ClientSession.
+        """
+        connector = TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl
+        )
+
+        timeout = ClientTimeout(
+            total=self.total_timeout,
+            connect=self.connect_timeout,
+            sock_read=self.read_timeout
+        )
+
+        headers = kwargs.pop("headers", {})
+        if not self.compress:
+            headers = dict(headers, **{"Accept-Encoding": "identity"})
+
+        return ClientSession(connector=connector, timeout=timeout, headers=headers, **kwargs)
@@ -0,0 +1,363 @@
+import asyncio
+import hashlib
+import heapq
+import inspect
+import json
+import logging
+import random
+from itertools import count
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .client import CHARACTER_COLUMNS, FREECOMPANY_COLUMNS, _profile_columns
+from .decoders import orjson
+from .exceptions import XIVAPINotFound
+from .ratelimit import RateLimiter
+
+__log__ = logging.getLogger(__name__)
+
+# Sections compared by default, as dotted paths into the responses of character_by_id and freecompany_by_id.
+# ParseDate and other fields changing on every fetch must be left out, or every refresh would be a change.
+CHARACTER_SECTIONS = (
+    "Character.Name",
+    "Character.Title",
+    "Character.Server",
+    "Character.FreeCompanyId",
+    "Character.ActiveClassJob",
+    "Character.ClassJobs",
+    "Character.GearSet",
+)
+
+FREECOMPANY_SECTIONS = (
+    "FreeCompany.Name",
+    "FreeCompany.Tag",
+    "FreeCompany.Rank",
+    "FreeCompany.ActiveMemberCount",
+    "FreeCompany.Estate",
+    "FreeCompanyMembers",
+)
+
+
+def section(data: Any, path: str) -> Any:
+    """The value at a dotted path of a decoded response, None when any part of it is missing."""
+    for key in path.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def digest(value: Any) -> bytes:
+    """A hash of value which doesn't depend on the order of its keys."""
+    if orjson is not None:
+        data = orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+    else:
+        data = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+
+class Change:
+    """
+    The sections of a watched character or Free Company which changed since its previous refresh.
+    Attributes
+    ------------
+    kind: str
+        "character" or "freecompany".
+    lodestone_id: int
+        The Lodestone ID of the character or Free Company.
+    sections: Dict[str, Any]
+        The new value of each changed section, keyed by its dotted path.
+    previous: Optional[Dict[str, Any]]
+        The previous value of each changed section when the watcher keeps values, None otherwise.
+    """
+
+    __slots__ = ("kind", "lodestone_id", "sections", "previous")
+
+    def __init__(self, kind: str, lodestone_id: int, sections: Dict[str, Any], previous: Optional[Dict[str, Any]] = None):
+        self.kind = kind
+        self.lodestone_id = lodestone_id
+        self.sections = sections
+        self.previous = previous
+
+    def __repr__(self):
+        return f'Change(kind={self.kind!r}, lodestone_id={self.lodestone_id!r}, sections={list(self.sections)!r})'
+
+
+class _Watched:
+    __slots__ = ("kind", "lodestone_id", "options", "sections", "hashes", "values", "interval", "due")
+
+    def __init__(self, kind: str, lodestone_id: int, options: dict, sections: Tuple[str, ...], interval: float):
+        self.kind = kind
+        self.lodestone_id = lodestone_id
+        self.options = options
+        self.sections = sections
+        self.hashes: Optional[Tuple[bytes, ...]] = None
+        self.values: Optional[Tuple[Any, ...]] = None
+        self.interval = interval
+        self.due = 0.0
+
+
+class Watcher:
+    """
+    Refreshes watched characters and Free Companies on their own schedule and reports what changed.
+    Each entity is refreshed at an adaptive interval: it is halved when a refresh finds a change and grows when
+    nothing changed, so quota is spent on active characters rather than on inactive ones. Only a hash of each
+    watched section is kept between refreshes.
+    Changes are handed to every callback, and to anyone iterating over the watcher with async for.
+    Parameters
+    ------------
+    client: XIVAPIClient
+        The client used for refreshes. Its rate limiter, retry policy and instrumentation apply.
+    concurrency: int
+        The maximum number of refreshes in flight. Defaults to 8.
+    rate: Optional[float]
+        Optionally cap refreshes per second, e.g. to leave part of the key's quota to other callers.
+    min_interval: float
+        The shortest interval in seconds between two refreshes of an entity. Defaults to 900, the lifetime of
+        cached profiles, since refreshing more often would be served from the cache.
+    max_interval: float
+        The longest interval in seconds between two refreshes of an entity. Defaults to a day.
+    initial_interval: Optional[float]
+        The interval of a newly watched entity. Defaults to min_interval.
+    backoff: float
+        The factor the interval grows by after a refresh without changes. Defaults to 2.
+    keep_values: bool
+        Whether to keep the watched sections in memory so that changes carry their previous values.
+        Defaults to False.
+    """
+
+    def __init__(self, client, concurrency: int = 8, rate: Optional[float] = None, min_interval: float = 900, max_interval: float = 86400, initial_interval: Optional[float] = None, backoff: float = 2, keep_values: bool = False):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("intervals must satisfy 0 < min_interval <= max_interval")
+
+        self.client = client
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(rate) if rate is not None else None
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval if initial_interval is not None else min_interval
+        self.backoff = backoff
+        self.keep_values = keep_values
+
+        self.callbacks: List[Callable[[Change], Union[None, Awaitable[None]]]] = []
+
+        self.refreshes = 0
+        self.changes = 0
+        self.errors = 0
+
+        self._watched: Dict[Tuple[str, int], _Watched] = {}
+        self._schedule: List[Tuple[float, int, _Watched]] = []
+        self._counter = count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._tasks = set()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "watched": len(self._watched),
+            "refreshes": self.refreshes,
+            "changes": self.changes,
+            "errors": self.errors,
+            "in_flight": len(self._tasks),
+        }
+
+    def interval(self, kind: str, lodestone_id: int) -> Optional[float]:
+        """The current refresh interval of a watched entity, None if it isn't watched."""
+        watched = self._watched.get((kind, int(lodestone_id)))
+        return watched.interval if watched is not None else None
+
+    def watch_character(self, lodestone_id: int, sections: Iterable[str] = CHARACTER_SECTIONS, **options) -> None:
+        """
+        Watch a character.
+        Parameters
+        ------------
+        lodestone_id: int
+            The character's Lodestone ID.
+        Optional[sections: Iterable[str]]
+            The dotted paths of the sections to compare. Defaults to CHARACTER_SECTIONS.
+        **options
+            Parameters of character_by_id. Only the watched sections are requested unless columns is given.
+        """
+        self._watch("character", lodestone_id, sections, options)
+
+    def watch_freecompany(self, lodestone_id: int, sections: Iterable[str] = FREECOMPANY_SECTIONS, **options) -> None:
+        """
+        Watch a Free Company.
+        Parameters
+        ------------
+        lodestone_id: int
+            The Free Company's Lodestone ID.
+        Optional[sections: Iterable[str]]
+            The dotted paths of the sections to compare. Defaults to FREECOMPANY_SECTIONS.
+        **options
+            Parameters of freecompany_by_id. Only the watched sections are requested unless columns is given.
+        """
+        self._watch("freecompany", lodestone_id, sections, options)
+
+    def unwatch(self, kind: str, lodestone_id: int) -> None:
+        self._watched.pop((kind, int(lodestone_id)), None)
+
+    def add_callback(self, callback: Callable[[Change], Union[None, Awaitable[None]]]) -> None:
+        """Call callback, a function or a coroutine function, with every Change."""
+        self.callbacks.append(callback)
+
+    def _watch(self, kind: str, lodestone_id: int, sections: Iterable[str], options: dict) -> None:
+        key = (kind, int(lodestone_id))
+        if key in self._watched:
+            return
+
+        sections = tuple(sections)
+        if "columns" not in options:
+            # Request the watched sections only, checking them now rather than failing on every refresh.
+            _profile_columns(sections, CHARACTER_COLUMNS if kind == "character" else FREECOMPANY_COLUMNS, [])
+            options["columns"] = sections
+
+        watched = _Watched(kind, int(lodestone_id), options, sections, self.initial_interval)
+        self._watched[key] = watched
+        self._schedule_at(watched, monotonic())
+
+    def _schedule_at(self, watched: _Watched, due: float) -> None:
+        watched.due = due
+        heapq.heappush(self._schedule, (due, next(self._counter), watched))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        """Start refreshing in the background. Must be called from a running event loop."""
+        if self._runner is None or self._runner.done():
+            self._wakeup = asyncio.Event()
+            self._runner = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """|coro|
+        Stop refreshing, cancelling refreshes in flight, and end every async for over the watcher.
+        """
+        tasks = [task for task in (self._runner, *self._tasks) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runner = None
+
+        if self._queue is not None:
+            self._queue.put_nowait(None)
+
+    async def __aenter__(self) -> "Watcher":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def __aiter__(self):
+        if self._queue is None:
+            # Changes are only queued once someone iterates, so callback-only watchers don't pile them up.
+            self._queue = asyncio.Queue()
+        return self
+
+    async def __anext__(self) -> Change:
+        change = await self._queue.get()
+        if change is None:
+            self._queue = None
+            raise StopAsyncIteration
+        return change
+
+    async def _run(self) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        while True:
+            if not self._schedule:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            due, _, watched = self._schedule[0]
+            delay = due - monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._schedule)
+            if watched.due != due or self._watched.get((watched.kind, watched.lodestone_id)) is not watched:
+                # Unwatched or rescheduled since this entry was pushed.
+                continue
+
+            await semaphore.acquire()
+            task = asyncio.ensure_future(self._refresh(watched))
+            self._tasks.add(task)
+            task.add_done_callback(lambda done: (self._tasks.discard(done), semaphore.release()))
+
+    async def _fetch(self, watched: _Watched):
+        if watched.kind == "character":
+            body = await self.client.character_by_id(watched.lodestone_id, raw=True, **watched.options)
+        else:
+            body = await self.client.freecompany_by_id(watched.lodestone_id, raw=True, **watched.options)
+        return self.client.decoder(body)
+
+    async def _refresh(self, watched: _Watched) -> None:
+        try:
+            if self.rate_limiter is not None:
+                async with self.rate_limiter:
+                    response = await self._fetch(watched)
+            else:
+                response = await self._fetch(watched)
+        except asyncio.CancelledError:
+            raise
+        except XIVAPINotFound:
+            self.errors += 1
+            __log__.warning(f'{watched.kind} {watched.lodestone_id} was not found, checking again in {self.max_interval}s')
+            self._reschedule(watched, self.max_interval)
+            return
+        except Exception:
+            self.errors += 1
+            __log__.exception(f'Refreshing {watched.kind} {watched.lodestone_id} failed')
+            self._reschedule(watched, watched.interval)
+            return
+
+        self.refreshes += 1
+        values = tuple(section(response, path) for path in watched.sections)
+        hashes = tuple(digest(value) for value in values)
+
+        changed = []
+        if watched.hashes is not None:
+            changed = [i for i, (old, new) in enumerate(zip(watched.hashes, hashes)) if old != new]
+
+        if changed:
+            change = Change(
+                watched.kind, watched.lodestone_id,
+                {watched.sections[i]: values[i] for i in changed},
+                {watched.sections[i]: watched.values[i] for i in changed} if watched.values is not None else None
+            )
+            watched.interval = max(self.min_interval, watched.interval / self.backoff)
+            await self._emit(change)
+        elif watched.hashes is not None:
+            watched.interval = min(self.max_interval, watched.interval * self.backoff)
+
+        watched.hashes = hashes
+        if self.keep_values:
+            watched.values = values
+
+        self._reschedule(watched, watched.interval)
+
+    def _reschedule(self, watched: _Watched, interval: float) -> None:
+        if self._watched.get((watched.kind, watched.lodestone_id)) is watched:
+            # A little jitter keeps entities watched together from being refreshed in lockstep forever. It only
+            # ever delays a refresh, which would be served from the cache if it came before min_interval.
+            self._schedule_at(watched, monotonic() + interval * random.uniform(1.0, 1.1))
+
+    async def _emit(self, change: Change) -> None:
+        self.changes += 1
+        if self._queue is not None:
+            self._queue.put_nowait(change)
+
+        for callback in self.callbacks:
+            try:
+                result = callback(change)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                __log__.exception(f'Watcher callback {callback!r} failed')
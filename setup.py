@@ -25,6 +25,10 @@ setuptools.setup(
     keywords='ffxiv xivapi',
     include_package_data=True,
     install_requires=REQUIREMENTS,
+    extras_require={
+        'orjson': ['orjson'],
+        'parquet': ['pyarrow>=14'],
+    },
     classifiers=[
         'License :: OSI Approved :: MIT License',
         'Intended Audience :: Developers',